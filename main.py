@@ -2,26 +2,14 @@
 
 import logging
 import time
-import sys
-import os
 
-try:
-    from trading_bot.utils.logger_config import setup_logger
-    from trading_bot.config import settings
-    from trading_bot.exchange.binance_client import BinanceFuturesClient
-    from trading_bot.core.trading_engine import TradingEngine
-    from trading_bot.utils.notifier import send_telegram_message
-    from trading_bot.core.strategy_factory import StrategyFactory
-except ImportError as e:
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-    if project_root not in sys.path:
-        sys.path.insert(0, project_root)
-    from trading_bot.utils.logger_config import setup_logger
-    from trading_bot.config import settings
-    from trading_bot.exchange.binance_client import BinanceFuturesClient
-    from trading_bot.core.trading_engine import TradingEngine
-    from trading_bot.utils.notifier import send_telegram_message
-    from trading_bot.core.strategy_factory import StrategyFactory
+from trading_bot.utils.logger_config import setup_logger
+from trading_bot.config import settings
+from trading_bot.exchange.binance_client import BinanceFuturesClient
+from trading_bot.core.trading_engine import TradingEngine
+from trading_bot.utils.notifier import send_telegram_message, flush_telegram_messages
+from trading_bot.utils.trade_logger import flush_trade_log
+from trading_bot.core.strategy_factory import StrategyFactory
 
 def main():
     """The main function to initialize and run the trading bot."""
@@ -90,8 +78,10 @@ if __name__ == "__main__":
         # Final catch-all for any exceptions that might slip through
         logging.getLogger("trading_bot").critical(f"Unhandled exception at the top level: {e}", exc_info=True)
     finally:
+        flush_trade_log()
         shutdown_message = "🛑 **X_bot SHUTDOWN** 🛑"
         send_telegram_message(shutdown_message)
+        flush_telegram_messages()
         
         logger = logging.getLogger("trading_bot")
         if logger.hasHandlers():
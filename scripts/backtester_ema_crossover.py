@@ -124,11 +124,7 @@ def run_backtest(args, logger):
                 entry_price = df.iloc[i]['open']
                 
                 # Capture indicator values at the moment of entry
-                entry_indicators = {}
-                last_indicator_candle = historical_data.iloc[-1]
-                for col in last_indicator_candle.index:
-                    if col.upper().startswith(('EMA', 'ATR')):
-                        entry_indicators[col] = last_indicator_candle[col]
+                entry_indicators = dict(strategy.last_indicators)
                 
                 # Open the position
                 position = {
@@ -0,0 +1,86 @@
+# scripts/profile_strategy.py (Offline timing/profiling of the strategy's hot path)
+
+import argparse
+import cProfile
+import pstats
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# --- Project Root Setup ---
+# This allows the script to be run from anywhere within the project.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# --- Project Module Imports ---
+from trading_bot.config import settings
+from trading_bot.core.strategy_factory import StrategyFactory
+
+
+def load_windows(datafile, window, count):
+    """
+    Cuts 'count' overlapping kline windows of 'window' candles from a downloaded klines CSV,
+    in the dict-of-arrays format the engine hands to the strategy.
+    """
+    df = pd.read_csv(datafile)
+    columns = {col: pd.to_numeric(df[col]).to_numpy(dtype=np.float64) for col in ['high', 'low', 'close']}
+    open_time = df['open_time'].to_numpy(dtype=np.int64)
+    last_start = len(df) - window
+    if last_start < 0:
+        raise ValueError(f"{datafile} has {len(df)} candles, fewer than the window size {window}.")
+    starts = np.linspace(0, last_start, num=min(count, last_start + 1), dtype=np.int64)
+    return {
+        f"W{i}": {'open_time': open_time[s:s + window], **{col: values[s:s + window] for col, values in columns.items()}}
+        for i, s in enumerate(starts)
+    }
+
+
+def time_call(label, func, repeat):
+    """Runs func 'repeat' times and prints the best and median wall time."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{label:<40} best {timings[0] * 1000:9.3f} ms   median {timings[len(timings) // 2] * 1000:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times (and optionally profiles) the strategy's signal generation on recorded klines.")
+    parser.add_argument('--datafile', type=str, required=True, help="Klines CSV from data_downloader.py.")
+    parser.add_argument('--strategy', type=str, default=settings.STRATEGY_NAME, help="Strategy name (see strategy_factory).")
+    parser.add_argument('--symbols', type=int, default=settings.SCAN_TOP_N_SYMBOLS, help="Kline windows evaluated per scan.")
+    parser.add_argument('--window', type=int, default=settings.STRATEGY_KLINE_LIMIT, help="Candles per window.")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed repetitions.")
+    parser.add_argument('--profile', type=str, default=None, help="Write cProfile stats of the batch call to this .prof file.")
+    args = parser.parse_args()
+
+    strategy_class = StrategyFactory(args.strategy)
+    strategy_params = {key: getattr(settings, name) for key, name in strategy_class.get_required_parameters().items()}
+    strategy = strategy_class(strategy_params)
+    windows = load_windows(args.datafile, args.window, args.symbols)
+    print(f"Strategy '{args.strategy}', {len(windows)} window(s) of {args.window} candles from {args.datafile}")
+
+    # Warm-up (JIT compilation / cache loading) is not part of the timings.
+    strategy.generate_signals_batch(windows)
+
+    time_call("generate_signal (one call per window)", lambda: [strategy.generate_signal(w) for w in windows.values()], args.repeat)
+    time_call("generate_signals_batch (one call)", lambda: strategy.generate_signals_batch(windows), args.repeat)
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        for _ in range(args.repeat):
+            strategy.generate_signals_batch(windows)
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        pstats.Stats(args.profile).sort_stats('cumulative').print_stats(15)
+        print(f"Profile saved to {args.profile} (view with e.g. 'snakeviz {args.profile}').")
+
+
+if __name__ == "__main__":
+    main()
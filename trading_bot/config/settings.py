@@ -20,33 +20,43 @@ if TRADING_MODE not in ["TESTNET", "LIVE"]:
 BINANCE_API_KEY = None
 BINANCE_API_SECRET = None
 BINANCE_FUTURES_BASE_URL = None
+BINANCE_FUTURES_WS_URL = None
 
 if TRADING_MODE == "TESTNET":
     BINANCE_API_KEY = os.getenv("BINANCE_TESTNET_API_KEY")
     BINANCE_API_SECRET = os.getenv("BINANCE_TESTNET_API_SECRET")
     BINANCE_FUTURES_BASE_URL = "https://testnet.binancefuture.com"
+    BINANCE_FUTURES_WS_URL = "wss://stream.binancefuture.com"
 elif TRADING_MODE == "LIVE":
     BINANCE_API_KEY = os.getenv("BINANCE_LIVE_API_KEY")
     BINANCE_API_SECRET = os.getenv("BINANCE_LIVE_API_SECRET")
     BINANCE_FUTURES_BASE_URL = "https://fapi.binance.com" 
+    BINANCE_FUTURES_WS_URL = "wss://fstream.binance.com"
 
 # --- Trading Engine Parameters ---
 ENGINE_LOOP_INTERVAL_SECONDS = int(os.getenv("ENGINE_LOOP_INTERVAL_SECONDS", 300))
 SCAN_TOP_N_SYMBOLS = int(os.getenv("SCAN_TOP_N_SYMBOLS", 20))
 default_min_volume = 10000 if TRADING_MODE == "TESTNET" else 50000000
 MIN_24H_QUOTE_VOLUME = float(os.getenv("MIN_24H_QUOTE_VOLUME", default_min_volume))
+SYMBOL_UNIVERSE_TTL_SECONDS = int(os.getenv("SYMBOL_UNIVERSE_TTL_SECONDS", 300)) # How long a top-volume symbol list is reused
 MAX_CONCURRENT_POSITIONS = int(os.getenv("MAX_CONCURRENT_POSITIONS", 1))
 POSITION_SIZE_USDT = float(os.getenv("POSITION_SIZE_USDT", 500.0)) # Default set to 500 as you requested
 LEVERAGE = int(os.getenv("TRADING_LEVERAGE", 10))
+# Detect SL/TP fills from the user-data WebSocket; the REST position check then only runs every N loops
+USE_USER_DATA_STREAM = os.getenv("USE_USER_DATA_STREAM", "true").lower() == "true"
+POSITION_RECONCILE_EVERY_N_LOOPS = int(os.getenv("POSITION_RECONCILE_EVERY_N_LOOPS", 10))
+# Worker threads for concurrent per-symbol REST calls (also the cap on requests in flight)
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", 8))
+BINANCE_REQUEST_WEIGHT_PER_MINUTE = int(os.getenv("BINANCE_REQUEST_WEIGHT_PER_MINUTE", 2400)) # Binance's per-IP request weight limit
+SCAN_FETCH_TIMEOUT_SECONDS = float(os.getenv("SCAN_FETCH_TIMEOUT_SECONDS", 30)) # Symbols slower than this are skipped for the loop
 
 ATR_PERIOD = int(os.getenv("ATR_PERIOD", 14))
 
 # --- Strategy Parameters (Loaded from .env) ---
 STRATEGY_KLINE_INTERVAL = os.getenv("STRATEGY_KLINE_INTERVAL", "15m")
 STRATEGY_KLINE_LIMIT = int(os.getenv("STRATEGY_KLINE_LIMIT", 200))
-
-# ATR Risk Management
-ATR_PERIOD = int(os.getenv("ATR_PERIOD", 14))
+# Keep the scanned symbols' klines current from the <symbol>@kline_<interval> WebSocket streams instead of REST polling
+USE_KLINE_STREAM = os.getenv("USE_KLINE_STREAM", "true").lower() == "true"
 
 # ==============================================================================
 # SIMPLE EMA CROSSOVER STRATEGY SETTINGS
@@ -72,9 +82,9 @@ TRADE_HISTORY_CSV_PATH = os.path.join(DATA_DIR, "trade_history.csv")
 LOG_FILE_PATH = os.path.join(LOG_DIR, f"trading_bot_{TRADING_MODE.lower()}.log")
 
 STATE_FILE_PATH = os.path.join(DATA_DIR, "open_positions.json")
-
-# --- Logging Configuration ---
-LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+KLINE_CACHE_DIR = os.path.join(DATA_DIR, "kline_cache") # On-disk kline buffers, so restarts only fetch missed candles
+# Bursts of state changes are coalesced into at most one state file write per interval
+STATE_SAVE_INTERVAL_SECONDS = float(os.getenv("STATE_SAVE_INTERVAL_SECONDS", 5))
 
 # --- Telegram Notification Settings ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
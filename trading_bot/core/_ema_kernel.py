@@ -0,0 +1,91 @@
+# trading_bot/core/_ema_kernel.py
+import numpy as np
+from numba import njit, prange
+
+
+@njit(cache=True, fastmath=True)
+def dual_ema_tail(close, alpha_s, alpha_l):
+    """
+    Streams the close array once, advancing a short and a long EMA in lockstep.
+    Both EMAs are seeded with close[0] (same as pandas' ewm(adjust=False)).
+
+    :return: (prev_short, last_short, prev_long, last_long) - the values at the
+             last two elements of 'close'.
+    """
+    s = close[0]
+    l = close[0]
+    prev_s = s
+    prev_l = l
+    for i in range(1, close.shape[0]):
+        prev_s = s
+        prev_l = l
+        s = alpha_s * close[i] + (1.0 - alpha_s) * s
+        l = alpha_l * close[i] + (1.0 - alpha_l) * l
+    return prev_s, s, prev_l, l
+
+
+@njit(cache=True)
+def wilder_atr_last(high, low, close, period):
+    """
+    ATR at the last element, computed the way pandas_ta does by default: the first bar has
+    no true range and the RMA is pandas' ewm(alpha=1/period) with adjust=True.
+
+    :return: The ATR value, or NaN if there are fewer than 'period' true-range values.
+    """
+    n = close.shape[0]
+    if n - 1 < period:
+        return np.nan
+    decay = 1.0 - 1.0 / period
+    num = 0.0
+    den = 0.0
+    for i in range(1, n):
+        prev_close = close[i - 1]
+        tr = max(high[i] - low[i], abs(high[i] - prev_close), abs(low[i] - prev_close))
+        num = tr + decay * num
+        den = 1.0 + decay * den
+    return num / den
+
+
+@njit(cache=True)
+def crossover_tail(high, low, close, alpha_s, alpha_l, atr_period):
+    """
+    The whole crossover check for one symbol in a single compiled call.
+
+    :return: (direction, last_short, last_long, atr) - direction is +1 (short EMA crossed above long EMA),
+             -1 (crossed below) or 0. NaN EMAs give direction 0 and NaN for the other values.
+    """
+    prev_s, last_s, prev_l, last_l = dual_ema_tail(close, alpha_s, alpha_l)
+    diff_prev = prev_s - prev_l
+    diff_last = last_s - last_l
+    direction = 0
+    # Explicit NaN test (NaN closes): this function isn't fastmath, so np.isnan is reliable here.
+    if np.isnan(diff_prev) or np.isnan(diff_last):
+        return direction, np.nan, np.nan, np.nan
+    if diff_prev < 0 and diff_last > 0:
+        direction = 1
+    elif diff_prev > 0 and diff_last < 0:
+        direction = -1
+    return direction, last_s, last_l, wilder_atr_last(high, low, close, atr_period)
+
+
+@njit(parallel=True, cache=True)
+def batch_crossover_tail(high_2d, low_2d, close_2d, alpha_s, alpha_l, atr_period, out_directions, out_atr):
+    """
+    Runs crossover_tail for many symbols at once, one row per symbol (rows processed in parallel).
+
+    Writes the direction into out_directions[i] and the last ATR value into out_atr[i].
+    """
+    for i in prange(close_2d.shape[0]):
+        direction, _, _, atr = crossover_tail(high_2d[i], low_2d[i], close_2d[i], alpha_s, alpha_l, atr_period)
+        out_directions[i] = direction
+        out_atr[i] = atr
+
+
+# Compile (or load from the on-disk cache) at import time so the first live signal doesn't pay the JIT cost.
+_warmup = np.ones(32, dtype=np.float64)
+dual_ema_tail(_warmup, 0.2, 0.1)
+wilder_atr_last(_warmup, _warmup, _warmup, 14)
+crossover_tail(_warmup[:-1], _warmup[:-1], _warmup[:-1], 0.2, 0.1, 14)
+_warmup_2d = np.ones((1, 33), dtype=np.float64)[:, :-1]  # sliced like the strategy's closed-candle view
+batch_crossover_tail(_warmup_2d, _warmup_2d, _warmup_2d, 0.2, 0.1, 14,
+                     np.zeros(1, dtype=np.int8), np.empty(1, dtype=np.float64))
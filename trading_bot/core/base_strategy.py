@@ -1,6 +1,7 @@
 # trading_bot/core/base_strategy.py
 
 from abc import ABC, abstractmethod
+from trading_bot.utils.kline_cache import KlineCache
 
 class BaseStrategy(ABC):
     def __init__(self, params: dict):
@@ -22,5 +23,20 @@ class BaseStrategy(ABC):
         if missing:
             raise ValueError(f"Missing strategy parameters: {missing}")
 
+    def generate_signals_batch(self, symbol_to_klines: dict) -> dict:
+        """
+        Birden fazla sembol için sinyal üretir: {sembol: kline verisi} -> {sembol: (sinyal, sl, tp)}.
+        Varsayılan olarak her sembol için generate_signal çağrılır; stratejiler bunu toplu bir hesaplamayla ezebilir.
+        """
+        return {symbol: self.generate_signal(data=klines) for symbol, klines in symbol_to_klines.items()}
+
+    @classmethod
+    def invalidate_cache(cls, symbol=None, interval=None):
+        """
+        Süreç genelinde paylaşılan kline önbelleğini (symbol, interval) için temizler.
+        Argümansız çağrılırsa tüm önbellek silinir.
+        """
+        KlineCache.invalidate(symbol, interval)
+
     # generate_signal metodu stratejiye özel olduğu için burada sadece abstract olarak kalabilir.
     # Ancak mevcut yapıda trading_engine içinde çağrıldığı için burada olmasına gerek yok.
\ No newline at end of file
@@ -1,10 +1,70 @@
 # trading_bot/core/market_scanner.py
 import logging
+import threading
+import time
 # from trading_bot.exchange.binance_client import BinanceFuturesClient # For type hinting if needed in other contexts
 
 logger = logging.getLogger("trading_bot")
 
-def get_top_volume_usdt_futures_symbols(client, count=20, min_quote_volume=50000000):
+# (count, min_quote_volume) -> (fetched_at, symbols), for get_top_volume_usdt_futures_symbols(max_age_seconds=...)
+_TOP_SYMBOLS_CACHE = {}
+# Keys with a background refresh in flight (see stale_while_revalidate_seconds)
+_REFRESHING = set()
+_REFRESH_LOCK = threading.Lock()
+
+def clear_top_symbols_cache():
+    """Makes the next get_top_volume_usdt_futures_symbols() call refetch, whatever its max_age_seconds."""
+    _TOP_SYMBOLS_CACHE.clear()
+
+def _refresh_top_symbols(client, count, min_quote_volume):
+    cache_key = (count, min_quote_volume)
+    try:
+        symbols = _fetch_top_volume_usdt_futures_symbols(client, count, min_quote_volume)
+        if symbols:
+            _TOP_SYMBOLS_CACHE[cache_key] = (time.monotonic(), symbols)
+    except Exception as e:
+        logger.error(f"Background refresh of the top symbols list failed: {e}", exc_info=True)
+    finally:
+        with _REFRESH_LOCK:
+            _REFRESHING.discard(cache_key)
+
+def get_top_volume_usdt_futures_symbols(client, count=20, min_quote_volume=50000000, max_age_seconds=0,
+                                        stale_while_revalidate_seconds=0):
+    """
+    Returns the top 'count' USDT-M PERPETUAL symbols ranked by 24h quote volume (see
+    _fetch_top_volume_usdt_futures_symbols). The ranking changes over minutes, so a list fetched
+    less than 'max_age_seconds' ago for the same arguments is reused.
+
+    :param client: Instance of BinanceFuturesClient.
+    :param count: Number of top symbols to return.
+    :param min_quote_volume: Minimum 24h quote volume in USDT to consider a symbol.
+    :param max_age_seconds: How long a fetched list may be reused. 0 always fetches.
+    :param stale_while_revalidate_seconds: For this long past max_age_seconds, the old list is still returned
+                                           right away while a background thread fetches a new one.
+    :return: List of symbol strings (e.g., ["BTCUSDT", "ETHUSDT"]), or an empty list.
+    """
+    cache_key = (count, min_quote_volume)
+    cached = _TOP_SYMBOLS_CACHE.get(cache_key)
+    if cached:
+        age = time.monotonic() - cached[0]
+        if age < max_age_seconds:
+            logger.debug("Using cached top symbols list (%d symbols).", len(cached[1]))
+            return list(cached[1])
+        if age < max_age_seconds + stale_while_revalidate_seconds:
+            with _REFRESH_LOCK:
+                start_refresh = cache_key not in _REFRESHING
+                _REFRESHING.add(cache_key)
+            if start_refresh:
+                threading.Thread(target=_refresh_top_symbols, args=(client, count, min_quote_volume),
+                                 name="TopSymbolsRefresh", daemon=True).start()
+            logger.debug("Using stale top symbols list (%d symbols) while it is refreshed.", len(cached[1]))
+            return list(cached[1])
+    symbols = _fetch_top_volume_usdt_futures_symbols(client, count, min_quote_volume)
+    if symbols:
+        _TOP_SYMBOLS_CACHE[cache_key] = (time.monotonic(), symbols)
+    return list(symbols)
+
+def _fetch_top_volume_usdt_futures_symbols(client, count, min_quote_volume):
     """
     Fetches USDT-margined PERPETUAL futures symbols, filters them by trading status
     and minimum 24h quote volume, and returns the top 'count' symbols ranked by volume.
@@ -14,8 +74,8 @@ def get_top_volume_usdt_futures_symbols(client, count=20, min_quote_volume=50000
     :param min_quote_volume: Minimum 24h quote volume in USDT to consider a symbol.
     :return: List of symbol strings (e.g., ["BTCUSDT", "ETHUSDT"]), or an empty list.
     """
-    logger.info(f"Attempting to fetch top {count} USDT-M PERPETUAL symbols by volume "
-                f"(min 24h quote_volume: {min_quote_volume} USDT)...")
+    logger.info("Attempting to fetch top %d USDT-M PERPETUAL symbols by volume (min 24h quote_volume: %s USDT)...",
+                count, min_quote_volume)
     
     # 1. Get a set of symbols that are USDT-M Perpetual and currently trading.
     # This is a much more robust filter than just checking if symbol.endswith("USDT").
@@ -32,7 +92,7 @@ def get_top_volume_usdt_futures_symbols(client, count=20, min_quote_volume=50000
             and s.get('contractType') == 'PERPETUAL'
             and s.get('quoteAsset') == 'USDT'
         }
-        logger.debug(f"Found {len(eligible_symbols_set)} active, USDT-margined, perpetual symbols.")
+        logger.debug("Found %d active, USDT-margined, perpetual symbols.", len(eligible_symbols_set))
 
     except Exception as e:
         logger.error(f"Error while getting/processing exchange_info for symbol filtering: {e}", exc_info=True)
@@ -71,7 +131,7 @@ def get_top_volume_usdt_futures_symbols(client, count=20, min_quote_volume=50000
     ranked_symbols = sorted(volume_filtered_symbols, key=lambda x: x['quoteVolume'], reverse=True)
     top_symbols_list = [item['symbol'] for item in ranked_symbols[:count]]
     
-    logger.info(f"Top {len(top_symbols_list)} symbols by volume (after all filters): {top_symbols_list}")
+    logger.info("Top %d symbols by volume (after all filters): %s", len(top_symbols_list), top_symbols_list)
 
     return top_symbols_list
 
@@ -0,0 +1,49 @@
+# trading_bot/core/position.py
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Optional
+
+
+class Side(IntEnum):
+    """Position direction. The value is the sign of the position, so PnL math is a multiply instead of a branch."""
+    BUY = 1   # Long
+    SELL = -1 # Short
+
+
+@dataclass(slots=True)
+class Position:
+    """
+    One open position as tracked by the TradingEngine (and persisted in its state file).
+    """
+    side: Side
+    entry_price: float
+    quantity: float
+    stop_loss_order_id: Optional[int] = None
+    take_profit_order_id: Optional[int] = None
+    entry_order_id: Optional[int] = None
+    entry_commission: Optional[float] = None # Filled in from the entry order's fill event on the user-data stream
+
+    def to_dict(self):
+        """Returns the position as a plain dict for the state file (keys are the attribute names)."""
+        return {
+            'side': self.side.name,
+            'entry_price': self.entry_price,
+            'quantity': self.quantity,
+            'stop_loss_order_id': self.stop_loss_order_id,
+            'take_profit_order_id': self.take_profit_order_id,
+            'entry_order_id': self.entry_order_id,
+            'entry_commission': self.entry_commission,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a Position from a state file record; missing fields get their defaults."""
+        return cls(
+            side=Side[data['side']],
+            entry_price=data.get('entry_price', 0.0),
+            quantity=data.get('quantity', 0.0),
+            stop_loss_order_id=data.get('stop_loss_order_id'),
+            take_profit_order_id=data.get('take_profit_order_id'),
+            entry_order_id=data.get('entry_order_id'),
+            entry_commission=data.get('entry_commission'),
+        )
@@ -1,8 +1,10 @@
 # trading_bot/core/simple_ema_crossover_strategy.py (Volatility Filter Added)
 
-import pandas as pd
-import pandas_ta as ta
+import math
+import numpy as np
 from trading_bot.core.base_strategy import BaseStrategy
+from trading_bot.core._ema_kernel import crossover_tail, batch_crossover_tail
+
 
 class SimpleEmaCrossoverStrategy(BaseStrategy):
     """
@@ -24,43 +26,109 @@ class SimpleEmaCrossoverStrategy(BaseStrategy):
             "max_volatility_threshold": "CROSSOVER_MAX_VOLATILITY_THRESHOLD",
         }
 
-    def generate_signal(self, data: pd.DataFrame):
-        """Generates a BUY or SELL signal based on the data, if volatility is within range."""
+    def __init__(self, params: dict):
+        super().__init__(params)
+        # Indicator values behind the most recent decision (used by the backtester's trade log)
+        self.last_indicators = {}
+
+        # Parameters are fixed for the lifetime of the instance, so derive everything once here.
+        self._alpha_fast = 2.0 / (params['fast_ema_period'] + 1)
+        self._alpha_slow = 2.0 / (params['slow_ema_period'] + 1)
+        self._atr_period = params['atr_period']
+        self._atr_sl_multiplier = params['atr_sl_multiplier']
+        self._atr_tp_multiplier = params['atr_tp_multiplier']
+        self._min_volatility = params['min_volatility_threshold']
+        self._max_volatility = params['max_volatility_threshold']
+        # Two closed candles with a valid slow EMA, plus the forming candle
+        self._min_points = params['slow_ema_period'] + 2
+
+    def generate_signal(self, data):
+        """
+        Generates a BUY or SELL signal based on the data, if volatility is within range.
+
+        :param data: Kline columns 'high', 'low' and 'close' - either a pandas DataFrame
+                     or a dict of NumPy arrays (see BinanceFuturesClient.get_historical_kline_arrays).
+        """
         try:
-            params = self.params
-            
-            # Calculate Indicators
-            data.ta.ema(length=params['fast_ema_period'], append=True, col_names=(f'EMA_fast',))
-            data.ta.ema(length=params['slow_ema_period'], append=True, col_names=(f'EMA_slow',))
-            data.ta.atr(length=params['atr_period'], append=True, col_names=(f'ATR',))
-
-            # Look at the last two candles for signals
-            last_candle = data.iloc[-2]
-            previous_candle = data.iloc[-3]
-            current_price = data.iloc[-1]['close']
-
-            # --- NEW: Volatility Filter Logic ---
-            # Normalize ATR as a percentage of the closing price
-            normalized_atr = (last_candle['ATR'] / last_candle['close']) * 100
-            
-            # Check if volatility is within the desired range
-            is_volatility_tradable = params['min_volatility_threshold'] <= normalized_atr <= params['max_volatility_threshold']
-            # ------------------------------------
-
-            # BUY Signal: Fast EMA crosses above Slow EMA AND volatility is tradable
-            is_buy_signal = previous_candle['EMA_fast'] < previous_candle['EMA_slow'] and last_candle['EMA_fast'] > last_candle['EMA_slow']
-            if is_buy_signal and is_volatility_tradable: # <-- VOLATILITY FILTER ADDED
-                sl_price = current_price - (last_candle['ATR'] * params['atr_sl_multiplier'])
-                tp_price = current_price + (last_candle['ATR'] * params['atr_tp_multiplier'])
-                return "BUY", sl_price, tp_price
-
-            # SELL Signal: Fast EMA crosses below Slow EMA AND volatility is tradable
-            is_sell_signal = previous_candle['EMA_fast'] > previous_candle['EMA_slow'] and last_candle['EMA_fast'] < last_candle['EMA_slow']
-            if is_sell_signal and is_volatility_tradable: # <-- VOLATILITY FILTER ADDED
-                sl_price = current_price + (last_candle['ATR'] * params['atr_sl_multiplier'])
-                tp_price = current_price - (last_candle['ATR'] * params['atr_tp_multiplier'])
-                return "SELL", sl_price, tp_price
+            # Calculate Indicators on the closed candles only (the last row is still forming),
+            # so each kernel's tail is the last closed candle.
+            high = np.asarray(data['high'], dtype=np.float64)[:-1]
+            low = np.asarray(data['low'], dtype=np.float64)[:-1]
+            close = np.asarray(data['close'], dtype=np.float64)
+            if close.shape[0] < self._min_points:
+                return None, None, None
+            current_price = close[-1]
+            close = close[:-1]
 
-            return None, None, None
+            # EMAs, crossover and ATR in one numba call.
+            # BUY: Fast EMA crosses above Slow EMA / SELL: Fast EMA crosses below Slow EMA
+            direction, last_fast, last_slow, atr = crossover_tail(high, low, close, self._alpha_fast, self._alpha_slow,
+                                                                  self._atr_period)
+            # Unparseable klines arrive as NaN. Checked explicitly: the EMA kernel is compiled with fastmath,
+            # which lets LLVM assume there are no NaNs, so failing comparisons can't be relied on.
+            if math.isnan(last_fast) or math.isnan(last_slow) or math.isnan(atr):
+                return None, None, None
+            self.last_indicators = {'EMA_fast': last_fast, 'EMA_slow': last_slow, 'ATR': atr}
+            return self._signal_from_direction(direction, atr, close[-1], current_price)
         except Exception:
-            return None, None, None
\ No newline at end of file
+            return None, None, None
+
+    def generate_signals_batch(self, symbol_to_klines: dict) -> dict:
+        """
+        Generates signals for many symbols in one parallel numba pass.
+
+        :param symbol_to_klines: {symbol: kline columns}, in the same format generate_signal accepts.
+        :return: {symbol: (signal, sl_price, tp_price)}, with (None, None, None) where there is no signal.
+        """
+        results = {}
+        # Series are stacked into a matrix, so group them by length (normally they are all kline_limit long).
+        symbols_by_length = {}
+        for symbol, data in symbol_to_klines.items():
+            length = len(data['close'])
+            if length < self._min_points:
+                results[symbol] = (None, None, None)
+            else:
+                symbols_by_length.setdefault(length, []).append(symbol)
+
+        for symbols in symbols_by_length.values():
+            try:
+                high = np.stack([np.asarray(symbol_to_klines[s]['high'], dtype=np.float64) for s in symbols])
+                low = np.stack([np.asarray(symbol_to_klines[s]['low'], dtype=np.float64) for s in symbols])
+                close = np.stack([np.asarray(symbol_to_klines[s]['close'], dtype=np.float64) for s in symbols])
+                directions = np.zeros(len(symbols), dtype=np.int8)
+                atrs = np.empty(len(symbols), dtype=np.float64)
+                # The last column is the forming candle; indicators use closed candles only.
+                batch_crossover_tail(high[:, :-1], low[:, :-1], close[:, :-1],
+                                     self._alpha_fast, self._alpha_slow, self._atr_period, directions, atrs)
+                for i, symbol in enumerate(symbols):
+                    if math.isnan(atrs[i]):
+                        results[symbol] = (None, None, None)
+                        continue
+                    results[symbol] = self._signal_from_direction(int(directions[i]), atrs[i], close[i, -2], close[i, -1])
+            except Exception:
+                for symbol in symbols:
+                    results[symbol] = (None, None, None)
+
+        return results
+
+    def _signal_from_direction(self, direction, atr, last_close, current_price):
+        """
+        Applies the volatility filter and ATR-based SL/TP to a crossover direction
+        (+1 BUY, -1 SELL, 0 no crossover) and returns (signal, sl_price, tp_price).
+        """
+        if not direction:
+            return None, None, None
+
+        # --- NEW: Volatility Filter Logic ---
+        # Normalize ATR as a percentage of the closing price
+        normalized_atr = (atr / last_close) * 100
+
+        # Check if volatility is within the desired range
+        if not (self._min_volatility <= normalized_atr <= self._max_volatility): # <-- VOLATILITY FILTER ADDED
+            return None, None, None
+        # ------------------------------------
+
+        # SL goes against the trade direction, TP with it.
+        sl_price = current_price - direction * (atr * self._atr_sl_multiplier)
+        tp_price = current_price + direction * (atr * self._atr_tp_multiplier)
+        return ("BUY" if direction > 0 else "SELL"), sl_price, tp_price
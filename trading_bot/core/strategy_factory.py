@@ -1,12 +1,26 @@
 # trading_bot/core/strategy_factory.py
 
-from trading_bot.core.simple_ema_crossover_strategy import SimpleEmaCrossoverStrategy # BU SATIRI EKLE
+import importlib
+
+# Strateji ismi -> "modül.yolu:SınıfAdı". Modüller sadece ilk kullanımda import edilir.
+_REGISTRY = {
+    "simple_ema_crossover": "trading_bot.core.simple_ema_crossover_strategy:SimpleEmaCrossoverStrategy",
+}
+_CACHE = {}
 
 def StrategyFactory(strategy_name: str):
     """
     Verilen strateji ismine göre ilgili strateji SINIFINI döndürür.
     """
-    if strategy_name == "simple_ema_crossover": # BU İKİ SATIRI EKLE
-        return SimpleEmaCrossoverStrategy
-    else:
-        raise ValueError(f"Bilinmeyen strateji: '{strategy_name}'. Lütfen .env dosyasını kontrol edin.")
\ No newline at end of file
+    strategy_class = _CACHE.get(strategy_name)
+    if strategy_class:
+        return strategy_class
+
+    spec = _REGISTRY.get(strategy_name)
+    if not spec:
+        raise ValueError(f"Bilinmeyen strateji: '{strategy_name}'. Lütfen .env dosyasını kontrol edin.")
+
+    module_path, class_name = spec.split(':')
+    strategy_class = getattr(importlib.import_module(module_path), class_name)
+    _CACHE[strategy_name] = strategy_class
+    return strategy_class
@@ -1,181 +1,522 @@
 # trading_bot/core/trading_engine.py
 
+import hashlib
 import logging
+import threading
 import time
-import json
 import os
-import sys
-import pandas as pd
-from datetime import datetime
-
+import random
+import orjson
+from concurrent.futures import ThreadPoolExecutor, wait
 try:
-    from trading_bot.config import settings
-    from trading_bot.exchange.binance_client import BinanceFuturesClient
-    from trading_bot.core.market_scanner import get_top_volume_usdt_futures_symbols
-    from trading_bot.utils.trade_logger import log_trade
-    from trading_bot.utils.notifier import send_telegram_message
-    from trading_bot.core.base_strategy import BaseStrategy
-except ImportError:
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-    if project_root not in sys.path: sys.path.insert(0, project_root)
-    from trading_bot.config import settings
-    from trading_bot.exchange.binance_client import BinanceFuturesClient
-    from trading_bot.core.market_scanner import get_top_volume_usdt_futures_symbols
-    from trading_bot.utils.trade_logger import log_trade
-    from trading_bot.utils.notifier import send_telegram_message
-    from trading_bot.core.base_strategy import BaseStrategy
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+from trading_bot.config import settings
+from trading_bot.exchange.binance_client import BinanceFuturesClient
+from trading_bot.core.market_scanner import get_top_volume_usdt_futures_symbols
+from trading_bot.utils.trade_logger import log_trade
+from trading_bot.utils.notifier import send_telegram_message
+from trading_bot.utils.kline_cache import KlineCache
+from trading_bot.core.base_strategy import BaseStrategy
+from trading_bot.core.position import Position, Side
 
 logger = logging.getLogger(__name__)
 
+# Per-loop banner logs carry this flag, so RateLimitFilter shows each at most once a minute
+_RATE_LIMITED = {'rate_limited': True}
+
+# Telegram message templates
+_POSITION_OPENED_TEMPLATE = "🚀 **NEW POSITION OPENED**\n`{symbol}` | **{side}**"
+_POSITION_CLOSED_TEMPLATE = "✅ **Position Closed:**\nSymbol: `{symbol}`\nReason: {reason} hit."
+
 class TradingEngine:
     def __init__(self, client: BinanceFuturesClient, strategy: BaseStrategy):
         self.client = client
         self.strategy = strategy 
-        self.running = False
+        self._stop_event = threading.Event()
+        # Set by stop(), by order fills from the user-data stream and by new candles from the kline stream
+        # to cut the wait between loops short
+        self._wakeup_event = threading.Event()
+        # Seconds to wait after a failed loop iteration; doubles on every consecutive failure
+        self._error_backoff = 1.0
         
         self.loop_interval_seconds = settings.ENGINE_LOOP_INTERVAL_SECONDS
         self.symbols_to_scan_count = settings.SCAN_TOP_N_SYMBOLS
+        self.symbol_universe_ttl_seconds = settings.SYMBOL_UNIVERSE_TTL_SECONDS
         self.max_concurrent_positions = settings.MAX_CONCURRENT_POSITIONS
         self.position_size_usdt = settings.POSITION_SIZE_USDT
         self.leverage = settings.LEVERAGE
+        self._leverage_set = {} # symbol -> leverage already applied on the exchange this session
+        self.kline_interval = settings.STRATEGY_KLINE_INTERVAL
+        self.kline_limit = 200
+        self.kline_cache = KlineCache(client, limit=self.kline_limit, max_age_seconds=self.loop_interval_seconds,
+                                      cache_dir=settings.KLINE_CACHE_DIR)
+        self.use_kline_stream = settings.USE_KLINE_STREAM
+        # symbol -> open time of the last closed candle that produced no signal. Until the next candle
+        # closes, the strategy's inputs (closed candles only) are the same, so it needn't run again.
+        self._no_signal_candles = {}
 
         self.state_file_path = settings.STATE_FILE_PATH
+        # Changes are appended to the journal; the snapshot in state_file_path is rewritten (and the journal
+        # emptied) only once the journal outgrows it, at most once per STATE_SAVE_INTERVAL_SECONDS.
+        self.journal_file_path = self.state_file_path + '.journal'
+        self.state_save_interval_seconds = settings.STATE_SAVE_INTERVAL_SECONDS
+        self._state_dirty = False
+        self._last_save_ts = 0.0
+        self._last_state_digest = None # blake2b digest of the snapshot on disk
+        self._pending_journal = [] # Encoded journal records not yet written
+        self._instance_lock = self._acquire_instance_lock()
+        # Only the loop thread reads or writes open_positions (and the journal). Pool workers get the data they
+        # need as arguments and return results through futures; stream listeners only push to queues.
+        # That keeps every check-then-act on it (max positions, open/close) race-free without a lock.
         self.open_positions = self._load_state()
+        self._flush_state(force=True)
+
+        # orderId -> (received_at, order dict) for FILLED orders pushed by the user-data stream
+        self._filled_orders = {}
+        self.use_user_data_stream = settings.USE_USER_DATA_STREAM
+        self.reconcile_every_n_loops = settings.POSITION_RECONCILE_EVERY_N_LOOPS
+        self._loops_since_reconcile = 0
+        # User-data stream connection the last reconciliation covered. Fills made while the stream was down
+        # are never delivered, so every (re)connect forces a reconciliation.
+        self._reconciled_stream_connection = 0
+
+        # Per-symbol kline fetches are independent and I/O bound, so they run concurrently
+        self._io_pool = ThreadPoolExecutor(max_workers=settings.IO_POOL_SIZE, thread_name_prefix="engine-io")
+        self.scan_fetch_timeout_seconds = settings.SCAN_FETCH_TIMEOUT_SECONDS
+
+    def _acquire_instance_lock(self):
+        """
+        Takes an exclusive flock on '<state file>.lock' for the engine's lifetime, so a second engine started
+        on the same state file fails right away instead of overwriting this one's positions.
+        Skipped where fcntl is unavailable (Windows).
+
+        :return: The open lock file (closing it releases the lock), or None.
+        """
+        if fcntl is None:
+            return None
+        os.makedirs(os.path.dirname(self.state_file_path) or '.', exist_ok=True)
+        lock_file = open(self.state_file_path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(f"Another TradingEngine is already running on {self.state_file_path}.")
+        return lock_file
 
     def _load_state(self):
-        if not os.path.exists(self.state_file_path): return {}
+        """Loads the state snapshot and replays the journal on top of it."""
+        positions = {}
         try:
-            with open(self.state_file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            if os.path.exists(self.state_file_path):
+                with open(self.state_file_path, 'rb') as f:
+                    payload = f.read()
+                positions = {symbol: Position.from_dict(data) for symbol, data in orjson.loads(payload).items()}
+                self._last_state_digest = hashlib.blake2b(payload, digest_size=16).digest()
+            if os.path.exists(self.journal_file_path):
+                with open(self.journal_file_path, 'rb') as f:
+                    for line in f:
+                        if not line.strip(): continue
+                        try:
+                            record = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            logger.warning("Ignoring a torn record at the end of the state journal.")
+                            break
+                        if record['op'] == 'upsert':
+                            positions[record['symbol']] = Position.from_dict(record['data'])
+                        else:
+                            positions.pop(record['symbol'], None)
+                        self._state_dirty = True
         except Exception as e:
             logger.error(f"Error loading state file: {e}")
             return {}
+        return positions
+
+    def _journal_change(self, symbol, op, data=None):
+        """
+        Records one change for the state journal. Changes are buffered and written by _flush_state,
+        which run() calls after each phase of the loop, so a phase costs at most one journal fsync.
+
+        :param op: 'upsert' (data is the Position) or 'delete'.
+        """
+        record = {'op': op, 'symbol': symbol}
+        if data is not None:
+            record['data'] = data.to_dict()
+        self._pending_journal.append(orjson.dumps(record) + b'\n')
+        self._state_dirty = True
 
-    def _save_state(self):
+    def _flush_state(self, force=False):
+        """
+        Appends the buffered changes to the journal, then compacts the journal into a fresh snapshot
+        (temp file + os.replace, skipped if its content is unchanged) and empties it. Unless forced,
+        compaction only runs when the journal is over 10x the snapshot size and the last compaction is
+        older than STATE_SAVE_INTERVAL_SECONDS.
+        """
+        if not self._state_dirty: return
         try:
-            with open(self.state_file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.open_positions, f, indent=4)
+            if self._pending_journal:
+                with open(self.journal_file_path, 'ab') as f:
+                    f.write(b''.join(self._pending_journal))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._pending_journal.clear()
+            if not force:
+                if time.monotonic() - self._last_save_ts < self.state_save_interval_seconds: return
+                snapshot_size = os.path.getsize(self.state_file_path) if os.path.exists(self.state_file_path) else 0
+                if os.path.getsize(self.journal_file_path) <= 10 * max(snapshot_size, 1024): return
+            payload = orjson.dumps({symbol: pos.to_dict() for symbol, pos in self.open_positions.items()})
+            digest = hashlib.blake2b(payload, digest_size=16).digest()
+            # The journal may net out to no change (e.g. a position opened and closed); keep the snapshot then.
+            if digest != self._last_state_digest:
+                tmp_path = self.state_file_path + '.tmp'
+                with open(tmp_path, 'wb', buffering=65536) as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.state_file_path)
+                self._last_state_digest = digest
+            # Replaying a stale journal over the new snapshot is harmless, so a crash right here loses nothing.
+            open(self.journal_file_path, 'wb').close()
+            self._state_dirty = False
+            self._last_save_ts = time.monotonic()
         except Exception as e:
             logger.error(f"CRITICAL: Could not save state: {e}")
 
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
     def stop(self):
-        self.running = False
+        self._stop_event.set()
+        self._wakeup_event.set()
 
     def run(self):
         logger.info("TradingEngine starting main loop...")
-        self.running = True
-        while self.running:
+        if self.use_user_data_stream:
+            self.client.start_user_stream(on_order_event=self._wakeup_event.set)
+        if self.use_kline_stream:
+            # The loop is woken about a second into each new candle, once the stream has appended it after the closed one,
+            # so signals are evaluated on the closed candle then instead of up to a loop interval later
+            self.client.start_kline_stream(self.kline_interval, self.kline_cache.apply_stream_kline,
+                                           on_candle_close=self._wakeup_event.set)
+        # Loop invariants, bound once
+        loop_interval = self.loop_interval_seconds
+        max_positions = self.max_concurrent_positions
+        stop_event, wakeup_event = self._stop_event, self._wakeup_event
+        while not stop_event.is_set():
+            # Iterations start every loop_interval_seconds; the time spent working is not added on top.
+            deadline = time.monotonic() + loop_interval
             try:
-                logger.info("--- Starting new trading loop iteration ---")
+                logger.info("--- Starting new trading loop iteration ---", extra=_RATE_LIMITED)
+                # Cleared before draining order events, so a fill arriving during this iteration still wakes the next wait
+                wakeup_event.clear()
                 self._manage_open_positions()
-                if len(self.open_positions) < self.max_concurrent_positions:
+                self._flush_state()
+                if len(self.open_positions) < max_positions:
                     self._scan_for_new_trades()
                 else:
-                    logger.info(f"Max concurrent positions ({self.max_concurrent_positions}) reached.")
+                    logger.info("Max concurrent positions (%d) reached.", max_positions, extra=_RATE_LIMITED)
+                self._flush_state()
                 
-                logger.info(f"--- Loop finished. Waiting for {self.loop_interval_seconds} seconds... ---")
-                time.sleep(self.loop_interval_seconds)
+                remaining = max(0.0, deadline - time.monotonic())
+                # The banner's arguments must stay constant for the rate limiter to collapse repeats
+                logger.info("--- Loop finished. Waiting for the next iteration... ---", extra=_RATE_LIMITED)
+                logger.debug("Next iteration in %.0f seconds.", remaining)
+                # A successful iteration halves the backoff left over from earlier errors
+                self._error_backoff = max(1.0, self._error_backoff * 0.5)
+                if wakeup_event.wait(remaining) and not stop_event.is_set():
+                    logger.info("Woken up early by an order update or a candle close.")
             except KeyboardInterrupt:
                 self.stop()
             except Exception as e:
                 logger.critical(f"A critical error occurred in the main trading loop: {e}", exc_info=True)
-                time.sleep(60)
+                self._flush_state()
+                # Capped exponential backoff with jitter, so repeated failures (e.g. an IP ban) don't
+                # have us - and every other client - retry at the same fixed instant.
+                delay = min(60.0, self._error_backoff) + random.uniform(0, self._error_backoff / 2)
+                logger.info("Retrying in %.1f seconds.", delay)
+                wakeup_event.wait(delay)
+                self._error_backoff = min(300.0, self._error_backoff * 2)
+        self._flush_state(force=True)
+        if self.use_user_data_stream:
+            self.client.stop_user_stream()
+        if self.use_kline_stream:
+            self.client.stop_kline_stream()
+        self._io_pool.shutdown(wait=False)
+        if self._instance_lock:
+            self._instance_lock.close()
         logger.info("TradingEngine has been stopped.")
 
+    def _drain_order_events(self):
+        """Moves FILLED order events pushed by the user-data stream into self._filled_orders (non-blocking)."""
+        now = time.monotonic()
+        order_events = self.client.order_events
+        while order_events:
+            _, order_id, order = order_events.popleft()
+            self._filled_orders[order_id] = (now, order)
+
+        # Fills of orders we don't track (e.g. entry orders) are only kept briefly, in case
+        # an SL/TP fill arrives before its position is recorded.
+        tracked_ids = {oid for pos in self.open_positions.values()
+                       for oid in (pos.entry_order_id, pos.stop_loss_order_id, pos.take_profit_order_id)}
+        for order_id, (received_at, _) in list(self._filled_orders.items()):
+            if order_id not in tracked_ids and now - received_at > 600:
+                del self._filled_orders[order_id]
+
     # --- COMPLETELY REWRITTEN FUNCTION FOR ROBUST MANAGEMENT ---
     def _manage_open_positions(self):
         """
-        Manages open positions by checking the single source of truth: the exchange's open positions list.
+        Manages open positions. SL/TP fills pushed by the user-data stream close positions immediately;
+        the exchange's open positions list (the single source of truth) is checked every
+        POSITION_RECONCILE_EVERY_N_LOOPS loops, or on every loop if the stream is not connected.
         If a position in our state is no longer open on the exchange, it's considered closed.
         """
+        self._drain_order_events()
         if not self.open_positions:
             logger.debug("No internal positions to manage.")
             return
 
-        logger.info(f"Managing {len(self.open_positions)} internal position(s): {list(self.open_positions.keys())}")
-        
-        # The single source of truth for what's currently open
-        exchange_open_positions_df = self.client.get_all_open_positions_df()
-        
-        # Iterate over a copy because we will modify the dictionary
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Managing %d internal position(s): %s", len(self.open_positions), ', '.join(self.open_positions), extra=_RATE_LIMITED)
+
         for symbol, internal_pos_data in list(self.open_positions.items()):
-            
-            # If the symbol from our state file is NOT in the list of open positions from the exchange...
-            if symbol not in exchange_open_positions_df.index:
-                logger.info(f"Position for {symbol} is no longer open on the exchange. Handling closure...")
-
-                # 1. CRITICAL STEP: Cancel any lingering SL/TP orders for this symbol. This fixes the bug.
-                logger.info(f"Cancelling all open orders for {symbol} to clean up...")
-                self.client.cancel_all_open_orders(symbol)
-                
-                # 2. Log the trade (we don't know the exact PnL without querying trade history, so log as "unknown")
-                log_trade({
-                    'symbol': symbol,
-                    'pnl_usd': 'Unknown (Closed by SL/TP)',
-                    'side': internal_pos_data.get('side'),
-                    'exit_reason': 'STOP_LOSS or TAKE_PROFIT'
-                })
-                
-                # 3. Send notification
-                send_telegram_message(f"✅ **Position Closed:**\nSymbol: `{symbol}`\nReason: Stop-Loss or Take-Profit hit.")
+            # The entry's commission comes with its fill event, so it's never fetched over REST
+            entry_fill = self._filled_orders.pop(internal_pos_data.entry_order_id, None)
+            if entry_fill:
+                internal_pos_data.entry_commission = entry_fill[1]['total_commission']
+                self._journal_change(symbol, 'upsert', internal_pos_data)
+            for order_key, exit_reason in (('stop_loss_order_id', 'STOP_LOSS'), ('take_profit_order_id', 'TAKE_PROFIT')):
+                filled = self._filled_orders.pop(getattr(internal_pos_data, order_key), None)
+                if filled:
+                    logger.info("%s order for %s was filled. Handling closure...", exit_reason, symbol)
+                    # SL/TP are closePosition orders, so a fill leaves the position flat: no REST check needed.
+                    order = filled[1]
+                    self._handle_closed_position(symbol, internal_pos_data, exit_reason, exit_price=float(order.get('ap', 0.0)),
+                                                 pnl=float(order.get('rp', 0.0)), commission=order['total_commission'])
+                    break
 
-                # 4. Remove from our internal state and save
-                del self.open_positions[symbol]
-                self._save_state()
-                logger.info(f"Position for {symbol} removed from internal state.")
+        self._loops_since_reconcile += 1
+        if self.open_positions and (not self.client.user_stream_connected
+                                    or self.client.user_stream_connection_count != self._reconciled_stream_connection
+                                    or self._loops_since_reconcile >= self.reconcile_every_n_loops):
+            self._reconcile_open_positions()
 
-            else:
-                # If the position is still open on the exchange, do nothing.
-                logger.debug(f"Position for {symbol} is still confirmed open on the exchange.")
-            
-            time.sleep(1) # Small delay between checking each internal position
+    def _reconcile_open_positions(self):
+        """
+        Closes every internal position that is no longer open on the exchange. Uses one positions
+        snapshot and one open-orders snapshot; only SL/TP orders missing from the latter are queried.
+        """
+        self._loops_since_reconcile = 0
+        # Read before the snapshot: fills after it arrive on this connection
+        stream_connection = self.client.user_stream_connection_count
+
+        # The single source of truth for what's currently open
+        exchange_open_symbols = self.client.get_open_position_symbols()
+        if exchange_open_symbols is None:
+            # Without the snapshot every position would look closed; try again next loop.
+            logger.warning("Could not fetch open positions from the exchange. Skipping reconciliation.")
+            return
+        self._reconciled_stream_connection = stream_connection
+        open_orders = self.client.get_all_open_orders()
+        open_order_ids = {o['orderId'] for o in open_orders} if open_orders is not None else None
+
+        # Positions in our state file that are NOT in the list of open positions from the exchange
+        closed_symbols = self.open_positions.keys() - exchange_open_symbols
+        if closed_symbols:
+            # The per-symbol exchange calls (order lookups, cancels) run concurrently; state changes stay on this thread.
+            exchange_cleanup = {symbol: self._io_pool.submit(self._clean_up_closed_position, symbol, self.open_positions[symbol],
+                                                             open_order_ids)
+                                for symbol in closed_symbols}
+            for symbol, future in exchange_cleanup.items():
+                logger.info("Position for %s is no longer open on the exchange. Handling closure...", symbol)
+                exit_reason, exit_order = future.result()
+                exit_price = float(exit_order.get('avgPrice', 0.0)) if exit_order else None
+                self._handle_closed_position(symbol, self.open_positions[symbol], exit_reason,
+                                             exit_price=exit_price, cancel_orders=False)
+
+        if open_order_ids is None:
+            return
+        for symbol in self.open_positions.keys() & exchange_open_symbols:
+            internal_pos_data = self.open_positions[symbol]
+            if (internal_pos_data.stop_loss_order_id not in open_order_ids
+                    and internal_pos_data.take_profit_order_id not in open_order_ids):
+                logger.warning("Position for %s is open but neither its SL nor its TP order is open anymore!", symbol)
+
+    def _clean_up_closed_position(self, symbol, internal_pos_data, open_order_ids):
+        """
+        Exchange-side part of a closure: finds the exit order, then cancels whatever orders are left.
+        Safe to call from worker threads.
+
+        :return: (exit_reason, order dict or None), as returned by _find_exit_order.
+        """
+        exit_reason, exit_order = self._find_exit_order(symbol, internal_pos_data, open_order_ids)
+        logger.info("Cancelling all open orders for %s to clean up...", symbol)
+        self.client.cancel_all_open_orders(symbol)
+        return exit_reason, exit_order
+
+    def _find_exit_order(self, symbol, internal_pos_data, open_order_ids):
+        """
+        Works out which of a closed position's SL/TP orders was filled. Orders still in the open-orders
+        snapshot are skipped; the others are queried one by one until a FILLED one is found.
+
+        :return: (exit_reason, order dict), or ('STOP_LOSS or TAKE_PROFIT', None) if unknown.
+        """
+        if open_order_ids is not None:
+            for order_key, exit_reason in (('stop_loss_order_id', 'STOP_LOSS'), ('take_profit_order_id', 'TAKE_PROFIT')):
+                order_id = getattr(internal_pos_data, order_key)
+                if order_id is None or order_id in open_order_ids:
+                    continue
+                order = self.client.query_order(symbol, order_id)
+                if order and order.get('status') == 'FILLED':
+                    return exit_reason, order
+        return 'STOP_LOSS or TAKE_PROFIT', None
+
+    def _handle_closed_position(self, symbol, internal_pos_data, exit_reason, exit_price=None, pnl=None, commission=None,
+                                cancel_orders=True):
+        """
+        Cleans up after a position that was closed on the exchange.
+
+        :param exit_reason: 'STOP_LOSS', 'TAKE_PROFIT', or 'STOP_LOSS or TAKE_PROFIT' if unknown.
+        :param exit_price: Average fill price of the exit order, if known.
+        :param pnl: Realized PnL of the exit order, if known.
+        :param commission: Commission paid on the exit order, if known.
+        :param cancel_orders: False if the caller has already cancelled the symbol's open orders.
+        """
+        # 1. CRITICAL STEP: Cancel any lingering SL/TP orders for this symbol. This fixes the bug.
+        if cancel_orders:
+            logger.info("Cancelling all open orders for %s to clean up...", symbol)
+            self.client.cancel_all_open_orders(symbol)
+
+        # 2. Log the trade (without the filled order we don't know the exact PnL, so log as "unknown")
+        side = internal_pos_data.side
+        entry_price = internal_pos_data.entry_price
+        trade = {
+            'symbol': symbol,
+            'pnl_usd': 'Unknown (Closed by SL/TP)',
+            'side': side.name,
+            'quantity': internal_pos_data.quantity,
+            'entry_price': entry_price,
+            'exit_reason': exit_reason
+        }
+        if exit_price is not None:
+            trade['exit_price'] = exit_price
+            if entry_price:
+                price_change = (exit_price - entry_price) / entry_price
+                trade['pnl_percentage'] = price_change * side
+        if pnl is not None:
+            trade['pnl_usdt'] = pnl
+        if commission is not None:
+            trade['exit_commission'] = commission
+        if internal_pos_data.entry_commission is not None:
+            trade['entry_commission'] = internal_pos_data.entry_commission
+            if commission is not None:
+                trade['total_commission'] = internal_pos_data.entry_commission + commission
+        log_trade(trade)
+
+        # 3. Send notification
+        send_telegram_message(_POSITION_CLOSED_TEMPLATE.format(symbol=symbol, reason=exit_reason))
+
+        # 4. Remove from our internal state and save
+        del self.open_positions[symbol]
+        self._journal_change(symbol, 'delete')
+        logger.info("Position for %s removed from internal state.", symbol)
 
     def _scan_for_new_trades(self):
-        # This function's logic remains the same
-        logger.info("Scanning for new trade opportunities...")
-        symbols_to_check = get_top_volume_usdt_futures_symbols(self.client)
+        logger.info("Scanning for new trade opportunities...", extra=_RATE_LIMITED)
+        symbols_to_check = self._get_symbol_universe()
         if not symbols_to_check:
             logger.warning("Market scanner returned no symbols.")
             return
 
-        for symbol in symbols_to_check:
-            if not self.running or len(self.open_positions) >= self.max_concurrent_positions: break
-            self._process_symbol_for_entry(symbol)
-            time.sleep(2)
+        # Fetch klines for all candidates concurrently, evaluate them in one batched strategy call,
+        # then trade sequentially in the scanner's (volume) order, since opening a position mutates self.open_positions.
+        candidates = [symbol for symbol in symbols_to_check if symbol not in self.open_positions]
+        futures = {self._io_pool.submit(self._fetch_klines_for_entry, symbol): symbol for symbol in candidates}
+        done, not_done = wait(futures, timeout=self.scan_fetch_timeout_seconds)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            logger.warning("Kline fetch timed out for %d symbol(s); skipping them this loop: %s",
+                           len(not_done), [futures[f] for f in not_done])
+        symbol_to_klines = {}
+        for future in done:
+            symbol, klines = futures[future], future.result()
+            if klines is not None and self._no_signal_candles.get(symbol) != klines['open_time'][-2]:
+                symbol_to_klines[symbol] = klines
+        logger.debug("Evaluating %d of %d candidate(s); the rest have no new closed candle.", len(symbol_to_klines), len(candidates))
 
-    def _process_symbol_for_entry(self, symbol):
-        # This function's logic remains the same
-        if symbol in self.open_positions: return False
         try:
-            klines_df = self.client.get_historical_klines(symbol, settings.STRATEGY_KLINE_INTERVAL, limit=200)
-            if klines_df.empty or len(klines_df) < 200: return False
-            
-            signal, sl_price, tp_price = self.strategy.generate_signal(data=klines_df)
-            
+            signals = self.strategy.generate_signals_batch(symbol_to_klines)
+        except Exception as e:
+            logger.error(f"Error generating signals for {len(symbol_to_klines)} symbol(s): {e}")
+            return
+        for symbol, klines in symbol_to_klines.items():
+            if signals.get(symbol, (None,))[0] is None:
+                self._no_signal_candles[symbol] = klines['open_time'][-2]
+            else:
+                # A signal's SL/TP depend on the forming candle's price, so signals themselves are never cached.
+                self._no_signal_candles.pop(symbol, None)
+
+        for symbol in candidates:
+            if self._stop_event.is_set() or len(self.open_positions) >= self.max_concurrent_positions: break
+            signal, sl_price, tp_price = signals.get(symbol, (None, None, None))
             if signal:
-                return self._execute_trade(symbol, signal, sl_price, tp_price)
+                # The forming candle's close is the price the SL/TP were computed from
+                self._execute_trade(symbol, signal, sl_price, tp_price, reference_price=float(symbol_to_klines[symbol]['close'][-1]))
+
+    def _get_symbol_universe(self):
+        """
+        Returns the top-volume symbol list. It is refetched once it is older than SYMBOL_UNIVERSE_TTL_SECONDS -
+        in the background for another TTL, during which the old list keeps being used, so the ~1 MB ticker
+        download stays off the loop.
+        """
+        ttl = self.symbol_universe_ttl_seconds
+        symbols = get_top_volume_usdt_futures_symbols(self.client, max_age_seconds=ttl, stale_while_revalidate_seconds=ttl)
+        if symbols and self.client.kline_stream:
+            self.client.kline_stream.set_symbols(symbols)
+        return symbols
+
+    def _fetch_klines_for_entry(self, symbol):
+        """
+        Fetches the klines the strategy needs for a symbol. Safe to call from worker threads.
+
+        :return: Dict of kline arrays, or None if they are unavailable or too short.
+        """
+        try:
+            klines = self.kline_cache.get_arrays(symbol, self.kline_interval)
+            if klines is None or klines['close'].shape[0] < self.kline_limit: return None
+            return klines
         except Exception as e:
             logger.error(f"Error processing {symbol} for entry: {e}")
-        return False
+        return None
 
-    def _execute_trade(self, symbol, signal, sl_price, tp_price):
+    def _execute_trade(self, symbol, signal, sl_price, tp_price, reference_price=None):
         # This function's logic remains the same
-        side = "BUY" if signal == "BUY" else "SELL"
-        logger.info(f"Executing {side} trade for {symbol}...")
+        side = Side.BUY if signal == "BUY" else Side.SELL
+        logger.info("Executing %s trade for %s...", side.name, symbol)
         try:
-            self.client.set_leverage(symbol, self.leverage)
+            if self._leverage_set.get(symbol) != self.leverage:
+                self.client.set_leverage(symbol, self.leverage)
+                self._leverage_set[symbol] = self.leverage
             entry, sl_order, tp_order = self.client.open_position_market_with_sl_tp(
-                symbol, side, self.position_size_usdt, sl_price, tp_price
+                symbol, side.name, self.position_size_usdt, sl_price, tp_price, reference_price=reference_price
             )
             if entry and sl_order and tp_order:
-                self.open_positions[symbol] = {
-                    "side": side, "entry_price": float(entry['avgPrice']),
-                    "quantity": float(entry['executedQty']),
-                    "stop_loss_order_id": sl_order.get('orderId'),
-                    "take_profit_order_id": tp_order.get('orderId')
-                }
-                self._save_state()
-                send_telegram_message(f"🚀 **NEW POSITION OPENED**\n`{symbol}` | **{side}**")
+                entry_price = float(entry['avgPrice'])
+                self.open_positions[symbol] = Position(
+                    side=side, entry_price=entry_price,
+                    quantity=float(entry['executedQty']),
+                    stop_loss_order_id=sl_order.get('orderId'),
+                    take_profit_order_id=tp_order.get('orderId'),
+                    entry_order_id=entry.get('orderId')
+                )
+                self._journal_change(symbol, 'upsert', self.open_positions[symbol])
+                if entry_price:
+                    logger.info("%s %s opened at %s: SL %.2f%% away, TP %.2f%% away.", symbol, side.name, entry_price,
+                                abs(entry_price - sl_price) / entry_price * 100, abs(tp_price - entry_price) / entry_price * 100)
+                send_telegram_message(_POSITION_OPENED_TEMPLATE.format(symbol=symbol, side=side.name))
                 return True
         except Exception as e:
             logger.error(f"Trade execution failed for {symbol}: {e}")
@@ -1,34 +1,70 @@
 # trading_bot/exchange/binance_client.py
 import logging
+import threading
+from collections import deque
 from binance.um_futures import UMFutures  # For USDT-M Futures (USDⓈ-M Futures)
+from binance.websocket.um_futures.websocket_client import UMFuturesWebsocketClient
 import time # For sleep
-import pandas as pd
+import orjson
+import numpy as np
 from binance.error import ClientError, ServerError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Attempt to import settings and logger setup function from the project structure
-try:
-    from trading_bot.config import settings
-    from trading_bot.utils.logger_config import setup_logger
-except ImportError:
-    # Fallback for direct execution
-    import sys
-    import os
-    current_script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root_dir = os.path.abspath(os.path.join(current_script_dir, '..', '..'))
-    if project_root_dir not in sys.path:
-        sys.path.insert(0, project_root_dir)
-    from trading_bot.config import settings
-    from trading_bot.utils.logger_config import setup_logger
+from trading_bot.config import settings
+from trading_bot.utils.logger_config import setup_logger
+from trading_bot.utils.rate_limiter import TokenBucket
 
 logger = logging.getLogger("trading_bot")
 
+def _kline_request_weight(limit):
+    """Request weight of GET /fapi/v1/klines for a given limit."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+def _to_float(value):
+    """float(value), or NaN if the value can't be parsed."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return float('nan')
+
 class BinanceFuturesClient:
+    # Exchange info (symbol filters) rarely changes; refetch it at most this often
+    EXCHANGE_INFO_TTL_SECONDS = 3600
+    REQUEST_TIMEOUT_SECONDS = 10
+    # Keep-alive connections per host; sized above settings.IO_POOL_SIZE so concurrent workers never wait for one
+    HTTP_POOL_SIZE = 16
+    # Entry order rejections that mean a just-made leverage change hasn't been applied yet; retried with backoff
+    LEVERAGE_PENDING_ERROR_CODES = (-4028,)
+    ENTRY_ORDER_MAX_ATTEMPTS = 3
+
     def __init__(self):
         logger.info(f"Initializing BinanceFuturesClient for {settings.TRADING_MODE} mode...")
         self.api_key = settings.BINANCE_API_KEY
         self.api_secret = settings.BINANCE_API_SECRET
         self.base_url = settings.BINANCE_FUTURES_BASE_URL
         self.exchange_info_cache = None 
+        self._exchange_info_fetched_at = 0.0
+        # Built from exchange_info_cache: symbol -> symbol info, and symbol -> {filterType: filter}
+        self._symbol_info_by_name = {}
+        self._symbol_filters = {}
+        self._quantizers = {} # symbol -> (quantize_price, quantize_quantity, min_qty), see _build_quantizers
+        # (symbol, orderId, order_dict) for every FILLED order pushed by the user-data stream.
+        # One producer (the stream thread), one consumer (the engine): deque.append/popleft are atomic,
+        # so the handoff needs no lock or condition variable, unlike queue.Queue.
+        self.order_events = deque()
+        self.user_stream = None
+        self.kline_stream = None
+        # Shared by all worker threads: the heavy endpoints are charged their request weight against the per-minute limit,
+        # and every response's used-weight header pulls it down to what Binance has actually counted (_sync_used_weight)
+        self.weight_limiter = TokenBucket(settings.BINANCE_REQUEST_WEIGHT_PER_MINUTE,
+                                          settings.BINANCE_REQUEST_WEIGHT_PER_MINUTE / 60.0)
 
         is_api_key_placeholder = (not self.api_key or 
                                   self.api_key.startswith("YOUR_") or 
@@ -52,7 +88,9 @@ class BinanceFuturesClient:
         logger.debug(f"API Key (first 5 chars): {str(self.api_key)[:5]}, Using Base URL: {self.base_url}")
         
         try:
-            self.client = UMFutures(key=self.api_key, secret=self.api_secret, base_url=self.base_url)
+            self.client = UMFutures(key=self.api_key, secret=self.api_secret, base_url=self.base_url,
+                                    timeout=self.REQUEST_TIMEOUT_SECONDS)
+            self._mount_connection_pool()
             logger.debug("UMFutures client instance created.")
         except Exception as e:
             logger.critical(f"Failed to create UMFutures client instance: {e}", exc_info=True)
@@ -61,6 +99,23 @@ class BinanceFuturesClient:
         self._test_connectivity()
         self._get_exchange_info() 
 
+    def _mount_connection_pool(self):
+        """
+        Replaces the default adapter of the connector's requests.Session with a larger keep-alive pool
+        and automatic retries. Only idempotent methods are retried (urllib3's default set, which
+        excludes POST), so an order is never sent twice.
+        """
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self.HTTP_POOL_SIZE, pool_maxsize=self.HTTP_POOL_SIZE, max_retries=retry)
+        self.client.session.mount('https://', adapter)
+        self.client.session.hooks['response'].append(self._sync_used_weight)
+
+    def _sync_used_weight(self, response, *args, **kwargs):
+        """requests response hook: feeds Binance's X-MBX-USED-WEIGHT-1M header into the weight limiter."""
+        used = response.headers.get('X-MBX-USED-WEIGHT-1M')
+        if used is not None:
+            self.weight_limiter.sync(int(used))
+
     def _test_connectivity(self):
         logger.info("Testing connectivity to Binance Futures API...")
         try:
@@ -71,12 +126,25 @@ class BinanceFuturesClient:
             raise 
 
     def _get_exchange_info(self):
-        if not self.exchange_info_cache: 
+        is_stale = time.monotonic() - self._exchange_info_fetched_at >= self.EXCHANGE_INFO_TTL_SECONDS
+        if not self.exchange_info_cache or is_stale: 
             logger.info("Fetching exchange information...")
             try:
-                self.exchange_info_cache = self.client.exchange_info()
+                exchange_info = self.client.exchange_info()
+                self._symbol_info_by_name = {item['symbol']: item for item in exchange_info['symbols']}
+                self._symbol_filters = {
+                    item['symbol']: {f_filter.get('filterType'): f_filter for f_filter in item.get('filters', [])}
+                    for item in exchange_info['symbols']
+                }
+                self._quantizers = {}
+                self.exchange_info_cache = exchange_info
+                self._exchange_info_fetched_at = time.monotonic()
                 logger.info("Successfully fetched and cached exchange information.")
             except Exception as e:
+                if self.exchange_info_cache:
+                    # Symbol rules rarely change; keep using the old copy and retry on the next call.
+                    logger.warning(f"Error refreshing exchange information, using the cached copy: {e}")
+                    return self.exchange_info_cache
                 logger.error(f"Error fetching exchange information: {e}", exc_info=True)
                 self.exchange_info_cache = None 
                 raise 
@@ -86,72 +154,86 @@ class BinanceFuturesClient:
         exchange_info = self._get_exchange_info()
         if not exchange_info:
             raise ConnectionError("Could not get exchange information. Client may be misconfigured or network issues.")
-        for item in exchange_info['symbols']:
-            if item['symbol'] == symbol.upper():
-                return item
+        item = self._symbol_info_by_name.get(symbol.upper())
+        if item:
+            return item
         logger.error(f"Symbol information for {symbol} not found in exchange info.")
         raise ValueError(f"Symbol information for {symbol} not found.")
 
     def _get_filter_value(self, symbol_info, filter_type, filter_key):
-        for f_filter in symbol_info.get('filters', []):
-            if f_filter.get('filterType') == filter_type:
-                return f_filter.get(filter_key)
-        return None
+        f_filter = self._symbol_filters.get(symbol_info.get('symbol'), {}).get(filter_type)
+        if f_filter is None:
+            # symbol_info that didn't come from the cached exchange info
+            for f_filter in symbol_info.get('filters', []):
+                if f_filter.get('filterType') == filter_type:
+                    return f_filter.get(filter_key)
+            return None
+        return f_filter.get(filter_key)
 
-    def _format_quantity(self, symbol, quantity):
-        try:
-            symbol_info = self._get_symbol_info(symbol)
-            step_size_str = self._get_filter_value(symbol_info, 'LOT_SIZE', 'stepSize')
-            min_qty_str = self._get_filter_value(symbol_info, 'LOT_SIZE', 'minQty')
+    @staticmethod
+    def _decimals(size_str):
+        """Number of decimals of a tick/step size string (e.g. "0.001" -> 3)."""
+        if '.' in size_str:
+            return len(size_str.split('.')[1].rstrip('0'))
+        return 0
 
-            if not step_size_str or not min_qty_str:
-                logger.warning(f"Step size or Min Qty not found for {symbol}, using raw quantity {quantity} formatted to a reasonable default precision.")
-                return float(f"{float(quantity):.8f}")
+    def _build_quantizers(self, symbol):
+        """
+        Builds the price and quantity rounding functions of 'symbol' from its PRICE_FILTER and LOT_SIZE
+        filters. They close over the parsed tick/step sizes, so formatting an order's prices and
+        quantity doesn't look up and parse the filters again.
 
-            step_size = float(step_size_str)
+        :return: (quantize_price, quantize_quantity, min_qty) - a function is None if its filter is missing.
+        """
+        symbol_info = self._get_symbol_info(symbol)
+        tick_size_str = self._get_filter_value(symbol_info, 'PRICE_FILTER', 'tickSize')
+        step_size_str = self._get_filter_value(symbol_info, 'LOT_SIZE', 'stepSize')
+        min_qty_str = self._get_filter_value(symbol_info, 'LOT_SIZE', 'minQty')
+
+        quantize_price = None
+        if tick_size_str:
+            tick_size, price_precision = float(tick_size_str), self._decimals(tick_size_str)
+            # Fiyatı en yakın tick_size katına yuvarla; string formatlama float hassasiyet sorunlarını giderir
+            quantize_price = lambda price: float(f"{round(price / tick_size) * tick_size:.{price_precision}f}")
+
+        quantize_quantity, min_qty = None, None
+        if step_size_str and min_qty_str:
+            step_size, quantity_precision = float(step_size_str), self._decimals(step_size_str)
             min_qty = float(min_qty_str)
-            
-            # Calculate precision from step_size (e.g., "0.001" -> 3)
-            if '.' in step_size_str:
-                precision = len(step_size_str.split('.')[1].rstrip('0'))
-            else: 
-                precision = 0 
-
-            # Miktarı step_size'ın en yakın katına (aşağıya) yuvarla ve string olarak formatla
-            # Örnek: quantity=0.00954, step_size=0.001 -> floor(0.00954/0.001)*0.001 = floor(9.54)*0.001 = 9*0.001 = 0.009
             if step_size > 0:
-                # Ensure quantity is a multiple of step_size, by truncating towards zero
-                # (value / step) * step -> then format to precision
-                num_steps = int(float(quantity) / step_size) # Kaç tane step_size içerdiği (tam sayı kısmı)
-                formatted_quantity_val = num_steps * step_size
+                # Miktarı step_size'ın katına (sıfıra doğru) yuvarla
+                # Örnek: quantity=0.00954, step_size=0.001 -> int(9.54)*0.001 = 0.009
+                quantize_quantity = lambda quantity: float(f"{int(quantity / step_size) * step_size:.{quantity_precision}f}")
             else: # step_size 0 ise (olmamalı ama)
-                formatted_quantity_val = float(quantity)
+                quantize_quantity = lambda quantity: float(f"{quantity:.{quantity_precision}f}")
+
+        quantizers = (quantize_price, quantize_quantity, min_qty)
+        self._quantizers[symbol] = quantizers
+        return quantizers
+
+    def _get_quantizers(self, symbol):
+        self._get_exchange_info() # Clears self._quantizers when the symbol rules are refreshed
+        quantizers = self._quantizers.get(symbol)
+        if quantizers is None:
+            quantizers = self._build_quantizers(symbol)
+        return quantizers
 
-            # Python'un float hassasiyet sorunlarından kaçınmak için string formatlama
-            formatted_quantity_str = f"{formatted_quantity_val:.{precision}f}"
-            formatted_quantity = float(formatted_quantity_str)
+    def _format_quantity(self, symbol, quantity):
+        try:
+            _, quantize_quantity, min_qty = self._get_quantizers(symbol)
+            if quantize_quantity is None:
+                logger.warning(f"Step size or Min Qty not found for {symbol}, using raw quantity {quantity} formatted to a reasonable default precision.")
+                return float(f"{float(quantity):.8f}")
 
-            logger.debug(f"Formatting quantity for {symbol}: original={quantity}, minQty={min_qty}, stepSize={step_size_str} (numeric: {step_size}), precision={precision}, pre-minQty-check-formatted={formatted_quantity}")
+            formatted_quantity = quantize_quantity(float(quantity))
+            logger.debug("Formatting quantity for %s: original=%s, minQty=%s, formatted=%s",
+                         symbol, quantity, min_qty, formatted_quantity)
 
             # Eğer formatlanmış miktar min_qty'den küçükse ve orijinal miktar 0'dan büyükse
             if formatted_quantity < min_qty and quantity > 0: # quantity > 0 kontrolü önemli
                 logger.warning(f"Formatted quantity {formatted_quantity} for {symbol} is less than minQty {min_qty}. Adjusting to minQty.")
-                # Bu durumda API hatası almamak için min_qty'ye eşitlemek bir seçenek olabilir,
-                # ancak bu istenen pozisyon büyüklüğünü değiştirir.
-                # Ya da hata fırlatıp pozisyon büyüklüğünün artırılmasını istemek daha doğru olabilir.
-                # Şimdilik, eğer orijinal miktar min_qty'den büyük veya eşitse ve formatlama min_qty'nin altına düşürdüyse,
-                # bu bir sorun. Eğer orijinal miktar zaten min_qty'den küçükse, sipariş zaten geçmemeli.
-                # Bu mantık, siparişin minimumları karşılamasını sağlamalı.
-                # If original quantity was intended to be at least min_qty, but formatting made it smaller (e.g. 0.001 becomes 0.0)
-                # this logic below is not perfect.
-                # The core idea is that the final quantity sent to API must be >= min_qty AND a multiple of step_size.
-
-                # If the calculated quantity (after being made a multiple of stepSize) is still less than minQty,
-                # but the *original intended quantity based on USDT value was trying to be something*,
-                # it means the position_size_usdt is too small for even minQty.
                 # The `ValueError` for `formatted_quantity <= 0` in `place_market_order` should catch if it becomes 0.
                 # If it's >0 but < min_qty, Binance will reject with a "LOT_SIZE" filter error.
-                # We rely on that Binance error for now if formatted_quantity is >0 but < min_qty.
                 pass # Let Binance reject if it's > 0 but < min_qty after formatting.
 
             return formatted_quantity
@@ -161,23 +243,13 @@ class BinanceFuturesClient:
         
     def _format_price(self, symbol, price):
         try:
-            symbol_info = self._get_symbol_info(symbol)
-            tick_size_str = self._get_filter_value(symbol_info, 'PRICE_FILTER', 'tickSize')
-
-            if not tick_size_str:
+            quantize_price = self._get_quantizers(symbol)[0]
+            if quantize_price is None:
                 logger.warning(f"Tick size not found for {symbol}, using default price formatting (8 decimals).")
                 return float(f"{float(price):.8f}")
 
-            tick_size = float(tick_size_str)
-            if '.' in tick_size_str:
-                precision = len(tick_size_str.split('.')[1].rstrip('0'))
-            else:
-                precision = 0
-            
-            formatted_price = (round(float(price) / tick_size)) * tick_size
-            formatted_price = float(f"{formatted_price:.{precision}f}")
-
-            logger.debug(f"Formatting price for {symbol}: original={price}, tickSize={tick_size_str}, precision={precision}, formatted={formatted_price}")
+            formatted_price = quantize_price(float(price))
+            logger.debug("Formatting price for %s: original=%s, formatted=%s", symbol, price, formatted_price)
             return formatted_price
         except Exception as e:
             logger.error(f"Error formatting price for {symbol} ({price}): {e}", exc_info=True)
@@ -197,7 +269,7 @@ class BinanceFuturesClient:
             raise 
 
     def get_ticker_price(self, symbol):
-        logger.debug(f"Fetching ticker price for {symbol.upper()}...")
+        logger.debug("Fetching ticker price for %s...", symbol)
         try:
             ticker_info = self.client.ticker_price(symbol=symbol.upper())
             price = float(ticker_info['price'])
@@ -225,7 +297,7 @@ class BinanceFuturesClient:
             'newOrderRespType': 'RESULT'
         }
         logger.info(f"Placing order with explicitly calculated and formatted quantity: {formatted_quantity} for {symbol.upper()}")
-        logger.debug(f"Parameters being sent to Binance API for new_order: {params}")
+        logger.debug("Parameters being sent to Binance API for new_order: %s", params)
         try:
             order = self.client.new_order(**params)
             logger.info(f"MARKET order placed successfully for {symbol.upper()}. Response: {order}")
@@ -234,29 +306,35 @@ class BinanceFuturesClient:
             logger.error(f"Failed to place MARKET order (using calculated quantity) for {symbol.upper()}: {e}", exc_info=True)
             raise
     
-    def place_take_profit_market_order(self, symbol, side, quantity, stop_price, reduce_only=True, trigger_on_mark_price=True):
+    def place_take_profit_market_order(self, symbol, side, quantity, stop_price, reduce_only=True, trigger_on_mark_price=True,
+                                       close_position=False):
         """
         Places a TAKE_PROFIT_MARKET order.
         :param trigger_on_mark_price: If True, uses 'MARK_PRICE'. If False, uses 'CONTRACT_PRICE' (Last Price).
+        :param close_position: If True, the order closes the whole position when triggered (closePosition=true);
+                               'quantity' and 'reduce_only' are then not sent, as Binance rejects them.
         """
-        formatted_quantity = self._format_quantity(symbol, quantity)
+        formatted_quantity = None if close_position else self._format_quantity(symbol, quantity)
         formatted_trigger_price = self._format_price(symbol, stop_price) 
         
         working_type = 'MARK_PRICE' if trigger_on_mark_price else 'CONTRACT_PRICE'
 
         logger.info(f"Attempting to place TAKE_PROFIT_MARKET order: {side} {formatted_quantity} {symbol.upper()} at triggerPrice {formatted_trigger_price}, "
-                    f"reduceOnly={reduce_only}, workingType={working_type}...")
+                    f"reduceOnly={reduce_only}, closePosition={close_position}, workingType={working_type}...")
         params = {
             'symbol': symbol.upper(),
             'side': side.upper(),
             'type': 'TAKE_PROFIT_MARKET',
-            'quantity': formatted_quantity,
             'stopPrice': formatted_trigger_price,
-            'reduceOnly': str(reduce_only).lower(),
             'workingType': working_type, # workingType parametresini ekliyoruz
             'newOrderRespType': 'RESULT'
         }
-        logger.debug(f"Parameters for TAKE_PROFIT_MARKET order: {params}")
+        if close_position:
+            params['closePosition'] = 'true'
+        else:
+            params['quantity'] = formatted_quantity
+            params['reduceOnly'] = str(reduce_only).lower()
+        logger.debug("Parameters for TAKE_PROFIT_MARKET order: %s", params)
         try:
             order = self.client.new_order(**params)
             logger.info(f"TAKE_PROFIT_MARKET order placed successfully. Response: {order}")
@@ -266,29 +344,35 @@ class BinanceFuturesClient:
             raise 
 
 
-    def place_stop_market_order(self, symbol, side, quantity, stop_price, reduce_only=True, trigger_on_mark_price=True):
+    def place_stop_market_order(self, symbol, side, quantity, stop_price, reduce_only=True, trigger_on_mark_price=True,
+                                close_position=False):
         """
         Places a STOP_MARKET order.
         :param trigger_on_mark_price: If True, uses 'MARK_PRICE'. If False, uses 'CONTRACT_PRICE' (Last Price).
+        :param close_position: If True, the order closes the whole position when triggered (closePosition=true);
+                               'quantity' and 'reduce_only' are then not sent, as Binance rejects them.
         """
-        formatted_quantity = self._format_quantity(symbol, quantity)
+        formatted_quantity = None if close_position else self._format_quantity(symbol, quantity)
         formatted_stop_price = self._format_price(symbol, stop_price)
         
         working_type = 'MARK_PRICE' if trigger_on_mark_price else 'CONTRACT_PRICE'
         
         logger.info(f"Attempting to place STOP_MARKET order: {side} {formatted_quantity} {symbol.upper()} at stopPrice {formatted_stop_price}, "
-                    f"reduceOnly={reduce_only}, workingType={working_type}...")
+                    f"reduceOnly={reduce_only}, closePosition={close_position}, workingType={working_type}...")
         params = {
             'symbol': symbol.upper(),
             'side': side.upper(),
             'type': 'STOP_MARKET',
-            'quantity': formatted_quantity,
             'stopPrice': formatted_stop_price,
-            'reduceOnly': str(reduce_only).lower(),
             'workingType': working_type, # workingType parametresini ekliyoruz
             'newOrderRespType': 'RESULT'
         }
-        logger.debug(f"Parameters for STOP_MARKET order: {params}")
+        if close_position:
+            params['closePosition'] = 'true'
+        else:
+            params['quantity'] = formatted_quantity
+            params['reduceOnly'] = str(reduce_only).lower()
+        logger.debug("Parameters for STOP_MARKET order: %s", params)
         try:
             order = self.client.new_order(**params)
             logger.info(f"STOP_MARKET order placed successfully. Response: {order}")
@@ -297,7 +381,8 @@ class BinanceFuturesClient:
             logger.error(f"Failed to place STOP_MARKET order: {e}", exc_info=True)
             raise 
     
-    def open_position_market_with_sl_tp(self, symbol, order_side, position_size_usdt, stop_loss_price, take_profit_price):
+    def open_position_market_with_sl_tp(self, symbol, order_side, position_size_usdt, stop_loss_price, take_profit_price,
+                                        reference_price=None):
         """
         Opens a new position with a MARKET order and immediately places both a 
         STOP_MARKET order for stop-loss and a TAKE_PROFIT_MARKET order for take-profit.
@@ -311,6 +396,8 @@ class BinanceFuturesClient:
         :param position_size_usdt: Desired nominal size of the position in USDT.
         :param stop_loss_price: The absolute price for the stop-loss trigger.
         :param take_profit_price: The absolute price for the take-profit trigger.
+        :param reference_price: Price the signal (and its SL/TP) was computed from. If given, the quantity is
+                                sized from it instead of fetching the mark price again.
         :return: Tuple containing the responses for the (entry_order, stop_loss_order, take_profit_order).
                  Returns None for any order that failed.
         """
@@ -323,7 +410,8 @@ class BinanceFuturesClient:
 
         # 1. Get current MARK PRICE to calculate the base asset quantity for the entry order.
         # This ensures consistency with the SL/TP triggers which also use Mark Price.
-        current_mark_price = self.get_mark_price(symbol)
+        # A reference price from the caller saves the round trip and sizes the order from the price the signal saw.
+        current_mark_price = reference_price if reference_price else self.get_mark_price(symbol)
         if not current_mark_price or current_mark_price <= 0:
             logger.error(f"Could not fetch a valid MARK PRICE for {symbol.upper()} (got: {current_mark_price}). Cannot calculate quantity for entry order.")
             return entry_order_response, stop_loss_order_response, take_profit_order_response
@@ -333,12 +421,22 @@ class BinanceFuturesClient:
         logger.info(f"Calculated base asset quantity for {position_size_usdt} USDT entry at MARK PRICE {current_mark_price} for {symbol.upper()}: {quantity_in_base_asset}")
         
         # 2. Place the MARKET order to open the position using the calculated quantity.
+        # Tried right away after a leverage change; a rejection because the change hasn't propagated yet is retried shortly.
         try:
-            entry_order_response = self.place_market_order(
-                symbol=symbol, 
-                side=order_side, 
-                quantity=quantity_in_base_asset 
-            )
+            for attempt in range(self.ENTRY_ORDER_MAX_ATTEMPTS):
+                try:
+                    entry_order_response = self.place_market_order(
+                        symbol=symbol, 
+                        side=order_side, 
+                        quantity=quantity_in_base_asset 
+                    )
+                    break
+                except ClientError as ce:
+                    if ce.error_code not in self.LEVERAGE_PENDING_ERROR_CODES or attempt == self.ENTRY_ORDER_MAX_ATTEMPTS - 1:
+                        raise
+                    delay = 0.1 * 2 ** attempt
+                    logger.warning(f"Entry order for {symbol.upper()} rejected ({ce.error_code}: {ce.error_message}). Retrying in {delay}s...")
+                    time.sleep(delay)
         except ValueError as ve: 
             # Catch ValueErrors from _format_quantity or other pre-API checks in place_market_order.
             logger.error(f"ValueError during market entry placement step: {ve}", exc_info=False) 
@@ -363,6 +461,8 @@ class BinanceFuturesClient:
                     f"Executed Quantity: {executed_quantity}. Avg Price: {entry_order_response.get('avgPrice')}")
 
         # Determine the side for the closing SL and TP orders (opposite of entry order).
+        # Both are closePosition orders: whichever triggers first closes the whole position (including any
+        # later size change), and the other can no longer open anything - it is cancelled on clean-up.
         sl_tp_side = "SELL" if order_side.upper() == "BUY" else "BUY"
         
         # 4. Place the STOP_MARKET order for stop-loss.
@@ -372,8 +472,8 @@ class BinanceFuturesClient:
                 side=sl_tp_side, 
                 quantity=executed_quantity, 
                 stop_price=stop_loss_price, 
-                reduce_only=True,
-                trigger_on_mark_price=True # Explicitly trigger on Mark Price
+                trigger_on_mark_price=True, # Explicitly trigger on Mark Price
+                close_position=True
             )
         except Exception as e:
             logger.error(f"Exception during stop-loss placement (entry order {entry_order_response.get('orderId')} was successful): {e}", exc_info=True) 
@@ -390,8 +490,8 @@ class BinanceFuturesClient:
                 side=sl_tp_side,
                 quantity=executed_quantity,
                 stop_price=take_profit_price, 
-                reduce_only=True,
-                trigger_on_mark_price=True # Explicitly trigger on Mark Price
+                trigger_on_mark_price=True, # Explicitly trigger on Mark Price
+                close_position=True
             )
         except Exception as e:
             logger.error(f"Exception during take-profit placement (entry order {entry_order_response.get('orderId')} was successful): {e}", exc_info=True)
@@ -406,7 +506,7 @@ class BinanceFuturesClient:
 
     def get_position_info(self, symbol):
         """Fetches current position information for a specific symbol."""
-        logger.debug(f"Fetching position risk information for {symbol.upper()}...")
+        logger.debug("Fetching position risk information for %s...", symbol)
         positions_risk_data = None
         try:
             # Try with "get_position_risk" first
@@ -423,7 +523,7 @@ class BinanceFuturesClient:
                 # Fallback to account() if specific position_risk methods are not found
                 return self._get_position_info_from_account(symbol) # Call a helper for account-based positions
 
-            logger.debug(f"Raw position_risk/get_position_risk API response for {symbol.upper()}: {positions_risk_data}")
+            logger.debug("Raw position_risk/get_position_risk API response for %s: %s", symbol, positions_risk_data)
 
             if not positions_risk_data:
                 logger.info(f"No position risk data returned by API for {symbol.upper()}.")
@@ -439,7 +539,8 @@ class BinanceFuturesClient:
                                 f"Leverage={pos.get('leverage', 'N/A')}")
                     active_positions.append(pos)
                 else:
-                    logger.debug(f"No active position amount for {symbol.upper()} in this position_risk entry (Amt: {pos.get('positionAmt', 0)}). Leverage set: {pos.get('leverage')}.")
+                    logger.debug("No active position amount for %s in this position_risk entry (Amt: %s). Leverage set: %s.",
+                                 symbol, pos.get('positionAmt', 0), pos.get('leverage'))
             
             if not active_positions:
                 logger.info(f"No active open position currently found for {symbol.upper()} via position_risk/get_position_risk.")
@@ -529,6 +630,22 @@ class BinanceFuturesClient:
             return None
 
 
+    def get_all_open_orders(self):
+        """
+        Fetches the open orders of ALL symbols with a single call (GET /fapi/v1/openOrders without a symbol, weight 40).
+
+        :return: List of order dictionaries, or None if an error occurs.
+        """
+        logger.debug("Fetching open orders for all symbols...")
+        try:
+            self.weight_limiter.acquire(40)
+            open_orders = self.client.get_orders(recvWindow=5000)
+            logger.debug("Found %d open order(s) across all symbols.", len(open_orders))
+            return open_orders
+        except Exception as e:
+            logger.error(f"Error fetching open orders for all symbols: {e}", exc_info=True)
+            return None
+
     def cancel_all_open_orders(self, symbol):
         logger.info(f"Attempting to cancel all open orders for {symbol.upper()}...")
         try:
@@ -545,43 +662,16 @@ class BinanceFuturesClient:
             return None
         
 
-    def query_order(self, symbol, order_id=None, orig_client_order_id=None):
-        """
-        Queries a specific order by its orderId or origClientOrderId.
-        One of order_id or orig_client_order_id must be provided.
-        """
-        if not order_id and not orig_client_order_id:
-            msg = "Either order_id or orig_client_order_id must be provided to query an order."
-            logger.error(msg)
-            raise ValueError(msg)
-
-        params = {
-            'symbol': symbol.upper(),
-            'recvWindow': 5000
-        }
-        if order_id:
-            params['orderId'] = order_id
-            logger.debug(f"Querying order for {symbol.upper()} by orderId: {order_id}")
-        elif orig_client_order_id:
-            params['origClientOrderId'] = orig_client_order_id
-            logger.debug(f"Querying order for {symbol.upper()} by origClientOrderId: {orig_client_order_id}")
-        
-        try:
-            order_info = self.client.query_order(**params)
-            logger.info(f"Successfully queried order for {symbol.upper()}. Response: {order_info}")
-            return order_info
-        except Exception as e:
-            logger.error(f"Error querying order for {symbol.upper()} (ID: {order_id or orig_client_order_id}): {e}", exc_info=True)
-            return None
-        
     def get_historical_klines(self, symbol, interval, limit=500):
         """
         Fetches historical klines and returns them as a structured pandas DataFrame.
         """
-        logger.debug(f"Fetching historical klines for {symbol} with interval {interval}, limit {limit}...")
+        import pandas as pd # Only the DataFrame helpers need pandas; the trading loop runs without loading it
+        logger.debug("Fetching historical klines for %s with interval %s, limit %s...", symbol, interval, limit)
         try:
             params = {'symbol': symbol.upper(), 'interval': interval, 'limit': limit}
             # Get raw kline data from the API (returns a list of lists)
+            self.weight_limiter.acquire(_kline_request_weight(limit))
             klines_data = self.client.klines(**params)
             
             if not klines_data:
@@ -607,7 +697,42 @@ class BinanceFuturesClient:
         except Exception as e:
             logger.error(f"Error fetching klines for {symbol}: {e}", exc_info=True)
             return pd.DataFrame() # Return an empty DataFrame on error
-        
+
+    def get_historical_kline_arrays(self, symbol, interval, limit=500, start_time=None):
+        """
+        Fetches historical klines and parses the columns the strategies use straight into
+        float64 NumPy arrays, skipping the DataFrame build of get_historical_klines().
+
+        :param start_time: Optional open time (ms) of the first kline to return, for incremental fetches.
+        :return: Dict with 'open_time' (int64 ms) and 'high', 'low', 'close' arrays (oldest first, each
+                 C-contiguous), or None if no data / on error.
+                 Values that can't be parsed become NaN, like pd.to_numeric(errors='coerce').
+        """
+        # Runs for every scanned symbol on every loop: keep the formatting lazy.
+        logger.debug("Fetching historical kline arrays for %s with interval %s, limit %s, start_time %s...",
+                     symbol, interval, limit, start_time)
+        try:
+            params = {'symbol': symbol.upper(), 'interval': interval, 'limit': limit}
+            if start_time is not None:
+                params['startTime'] = int(start_time)
+            self.weight_limiter.acquire(_kline_request_weight(limit))
+            klines_data = self.client.klines(**params)
+            if not klines_data:
+                return None
+
+            # Kline row layout: [open_time, open, high, low, close, volume, close_time, ...]
+            # One parsing pass (ms open times are exact in float64), then transposed so every column is contiguous.
+            try:
+                rows = np.array([k[:5] for k in klines_data], dtype=np.float64)
+            except (ValueError, TypeError):
+                rows = np.array([[_to_float(v) for v in k[:5]] for k in klines_data], dtype=np.float64)
+            columns = np.ascontiguousarray(rows.T)
+            return {'open_time': columns[0].astype(np.int64), 'high': columns[2], 'low': columns[3], 'close': columns[4]}
+
+        except Exception as e:
+            logger.error(f"Error fetching kline arrays for {symbol}: {e}", exc_info=True)
+            return None
+
     def get_all_tickers_24hr(self):
         """
         Fetches 24-hour price change statistics for all available symbols
@@ -621,6 +746,7 @@ class BinanceFuturesClient:
         try:
             # Doğrudan ticker_24hr_price_change metodunu çağırıyoruz.
             # symbol=None argümanı, kütüphanenin tüm semboller için veri getirmesini sağlamalıdır.
+            self.weight_limiter.acquire(40)
             tickers_data = self.client.ticker_24hr_price_change(symbol=None) 
             
             if tickers_data:
@@ -662,7 +788,7 @@ class BinanceFuturesClient:
             'orderId': order_id,
             'recvWindow': 5000
         }
-        logger.debug(f"Querying specific order with params: {params}")
+        logger.debug("Querying specific order with params: %s", params)
         try:
             # self.sign_request is the core authenticated request method in the library
             order_data = self.client.sign_request("GET", url_path, params)
@@ -733,7 +859,7 @@ class BinanceFuturesClient:
         
     def get_mark_price(self, symbol):
         """Fetches the mark price for a specific symbol."""
-        logger.debug(f"Fetching mark price for {symbol.upper()}...")
+        logger.debug("Fetching mark price for %s...", symbol)
         try:
             # The library method is usually named mark_price
             mark_price_data = self.client.mark_price(symbol=symbol.upper())
@@ -767,7 +893,7 @@ class BinanceFuturesClient:
             'closePosition': 'true', # This parameter tells Binance to close the whole position
             'newOrderRespType': 'RESULT'
         }
-        logger.debug(f"Parameters for closePosition order: {params}")
+        logger.debug("Parameters for closePosition order: %s", params)
         try:
             order = self.client.new_order(**params)
             logger.info(f"closePosition MARKET order for {symbol} placed successfully. Response: {order}")
@@ -776,11 +902,88 @@ class BinanceFuturesClient:
             logger.error(f"Failed to place closePosition MARKET order for {symbol}: {e}", exc_info=True)
             return None
         
+    def start_user_stream(self, on_order_event=None):
+        """
+        Starts the user-data WebSocket listener, which pushes FILLED order updates into self.order_events.
+
+        :param on_order_event: Optional callable (no arguments), called after each event is queued.
+        :return: True if the listener thread was started, False otherwise.
+        """
+        if self.user_stream and self.user_stream.is_alive():
+            return True
+        try:
+            self.user_stream = UserStreamListener(self.client, settings.BINANCE_FUTURES_WS_URL, self.order_events,
+                                                  on_order_event=on_order_event)
+            self.user_stream.start()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start the user-data stream: {e}", exc_info=True)
+            self.user_stream = None
+            return False
+
+    def stop_user_stream(self):
+        if self.user_stream:
+            self.user_stream.stop()
+            self.user_stream = None
+
+    @property
+    def user_stream_connected(self):
+        return bool(self.user_stream and self.user_stream.connected)
+
+    @property
+    def user_stream_connection_count(self):
+        """Number of times the user-data stream has (re)connected; 0 if it isn't running."""
+        return self.user_stream.connection_count if self.user_stream else 0
+
+    def start_kline_stream(self, interval, on_kline, on_candle_close=None):
+        """
+        Starts the kline WebSocket listener. Symbols are (re)subscribed with self.kline_stream.set_symbols().
+
+        :param interval: Kline interval to subscribe to, e.g. "15m".
+        :param on_kline: Callable(symbol, interval, open_time, high, low, close), called for every kline update.
+        :param on_candle_close: Optional callable without arguments, called once per candle shortly after the next
+                                candle's first updates, i.e. once the closed candle is no longer the last row.
+        :return: True if the listener thread was started, False otherwise.
+        """
+        if self.kline_stream and self.kline_stream.is_alive():
+            return True
+        try:
+            self.kline_stream = KlineStreamListener(settings.BINANCE_FUTURES_WS_URL, interval, on_kline, on_candle_close)
+            self.kline_stream.start()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start the kline stream: {e}", exc_info=True)
+            self.kline_stream = None
+            return False
+
+    def stop_kline_stream(self):
+        if self.kline_stream:
+            self.kline_stream.stop()
+            self.kline_stream = None
+
+    def get_open_position_symbols(self):
+        """
+        Fetches the symbols that currently have a non-zero position, using a single API call.
+
+        :return: Set of symbol strings, or None if the positions could not be fetched.
+        """
+        logger.debug("Fetching open position symbols...")
+        try:
+            self.weight_limiter.acquire(5)
+            return {p['symbol'] for p in self.client.get_position_risk() if float(p.get('positionAmt', 0)) != 0}
+        except (ClientError, ServerError) as e:
+            logger.error(f"API Error fetching all position risk data: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"A general error occurred in get_open_position_symbols: {e}", exc_info=True)
+            return None
+
     def get_all_open_positions_df(self):
         """
         Fetches all account positions with a non-zero position amount using a single API call.
         This version is robust against missing columns in the API response.
         """
+        import pandas as pd # See get_historical_klines
         logger.debug("Fetching all open positions...")
         try:
             all_positions_risk = self.client.get_position_risk()
@@ -815,7 +1018,254 @@ class BinanceFuturesClient:
              logger.error(f"A general error occurred in get_all_open_positions_df: {e}", exc_info=True)
              return pd.DataFrame()
     
+class UserStreamListener(threading.Thread):
+    """
+    Keeps a Binance Futures user-data stream open (listenKey + WebSocket) and forwards
+    ORDER_TRADE_UPDATE events with status FILLED to a queue as (symbol, orderId, order_dict).
+    The order dict gets an extra 'total_commission' key: 'n' only covers the last fill, so the
+    commission of earlier partial fills is summed up here.
+    Reconnects with a fresh listenKey whenever the socket closes or the keepalive fails.
+    """
+    KEEPALIVE_SECONDS = 30 * 60
+    RECONNECT_DELAY_SECONDS = 5
+
+    def __init__(self, um_client, stream_url, order_events, on_order_event=None):
+        """
+        :param um_client: The UMFutures REST client (used for the listenKey endpoints).
+        :param stream_url: WebSocket base URL, e.g. "wss://fstream.binance.com".
+        :param order_events: deque receiving the FILLED order events.
+        :param on_order_event: Optional callable (no arguments), called after each event is queued, and after each
+                               (re)connect, since fills during the gap were not delivered.
+        """
+        super().__init__(name="UserStreamListener", daemon=True)
+        self.um_client = um_client
+        self.stream_url = stream_url
+        self.order_events = order_events
+        self._put_order_event = order_events.append
+        self.on_order_event = on_order_event
+        self.connected = False
+        # Incremented on every successful connect: a new value means fills may have been missed before it
+        self.connection_count = 0
+        self._partial_commissions = {} # orderId -> commission of its fills so far (only touched by the WebSocket thread)
+        self._listen_key = None
+        self._ws_client = None
+        self._stop_event = threading.Event()
+        self._reconnect_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self._reconnect_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._connect()
+                # Wake up for the keepalive, or early if the socket reports a close/error.
+                while not self._stop_event.is_set():
+                    if self._reconnect_event.wait(self.KEEPALIVE_SECONDS):
+                        break
+                    self.um_client.renew_listen_key(self._listen_key)
+                    logger.debug("User-data stream listenKey renewed.")
+            except Exception as e:
+                logger.error(f"User-data stream error: {e}", exc_info=True)
+            self._disconnect()
+            if not self._stop_event.is_set():
+                logger.warning(f"User-data stream disconnected. Reconnecting in {self.RECONNECT_DELAY_SECONDS}s...")
+                self._stop_event.wait(self.RECONNECT_DELAY_SECONDS)
+
+    def _connect(self):
+        self._reconnect_event.clear()
+        self._listen_key = self.um_client.new_listen_key()['listenKey']
+        self._ws_client = UMFuturesWebsocketClient(
+            stream_url=self.stream_url,
+            on_message=self._on_message,
+            on_close=self._on_close,
+            on_error=self._on_error,
+        )
+        self._ws_client.user_data(listen_key=self._listen_key, id=1)
+        self.connection_count += 1
+        self.connected = True
+        logger.info("User-data stream connected.")
+        if self.on_order_event:
+            self.on_order_event()
+
+    def _disconnect(self):
+        self.connected = False
+        if self._ws_client:
+            try:
+                self._ws_client.stop()
+            except Exception as e:
+                logger.debug(f"Error while stopping the user-data WebSocket: {e}")
+            self._ws_client = None
+        if self._listen_key:
+            try:
+                self.um_client.close_listen_key(self._listen_key)
+            except Exception as e:
+                logger.debug(f"Error while closing the listenKey: {e}")
+            self._listen_key = None
+
+    def _on_message(self, _, message, _loads=orjson.loads):
+        # Most user-data messages (ACCOUNT_UPDATE, MARGIN_CALL...) are of no interest here:
+        # a substring test rejects them without parsing.
+        if 'ORDER_TRADE_UPDATE' not in message:
+            if 'listenKeyExpired' in message:
+                logger.warning("User-data stream listenKey expired.")
+                self._reconnect_event.set()
+            return
+        try:
+            order = _loads(message)['o']
+        except (orjson.JSONDecodeError, KeyError):
+            logger.warning(f"Unparseable user-data stream message: {message}")
+            return
+        status = order['X']
+        if status == 'FILLED':
+            order['total_commission'] = self._partial_commissions.pop(order['i'], 0.0) + float(order.get('n', 0.0))
+            self._put_order_event((order['s'], order['i'], order))
+            if self.on_order_event:
+                self.on_order_event()
+        elif status == 'PARTIALLY_FILLED':
+            self._partial_commissions[order['i']] = self._partial_commissions.get(order['i'], 0.0) + float(order.get('n', 0.0))
+        elif status in ('CANCELED', 'EXPIRED'):
+            self._partial_commissions.pop(order['i'], None)
+
+    def _on_close(self, _):
+        self.connected = False
+        self._reconnect_event.set()
+
+    def _on_error(self, _, error):
+        logger.error(f"User-data WebSocket error: {error}")
+        self.connected = False
+        self._reconnect_event.set()
+
+
+class KlineStreamListener(threading.Thread):
+    """
+    Subscribes to the <symbol>@kline_<interval> market streams of a changing set of symbols on one
+    WebSocket connection and passes every update to on_kline(symbol, interval, open_time, high, low, close).
+    Reconnects, and resubscribes the current symbols, whenever the socket closes.
+    """
+    RECONNECT_DELAY_SECONDS = 5
+    # Delay between the first update of a new candle and on_candle_close, so every symbol's first update
+    # (the stream pushes every 250 ms) has reached on_kline by then
+    CANDLE_CLOSE_SETTLE_SECONDS = 1.0
+
+    def __init__(self, stream_url, interval, on_kline, on_candle_close=None):
+        """
+        :param stream_url: WebSocket base URL, e.g. "wss://fstream.binance.com".
+        :param interval: Kline interval, e.g. "15m".
+        :param on_kline: Callable receiving each update (prices as floats, open_time in ms).
+        :param on_candle_close: Optional callable without arguments, called CANDLE_CLOSE_SETTLE_SECONDS after the
+                                first update of a new candle - when the closed candle has become the second-to-last row.
+        """
+        super().__init__(name="KlineStreamListener", daemon=True)
+        self.stream_url = stream_url
+        self.interval = interval
+        self.on_kline = on_kline
+        self.on_candle_close = on_candle_close
+        self._newest_open_time = 0 # All symbols' candles open together: on_candle_close fires once per candle
+        self.connected = False
+        self._symbols = set()
+        self._symbols_lock = threading.Lock()
+        self._ws_client = None
+        self._stop_event = threading.Event()
+        self._reconnect_event = threading.Event()
+
+    def _stream_names(self, symbols):
+        return [f"{symbol.lower()}@kline_{self.interval}" for symbol in sorted(symbols)]
+
+    def set_symbols(self, symbols):
+        """Subscribes to the symbols that are new and unsubscribes from the ones no longer in 'symbols'."""
+        symbols = set(symbols)
+        with self._symbols_lock:
+            added = symbols - self._symbols
+            removed = self._symbols - symbols
+            self._symbols = symbols
+            ws_client = self._ws_client if self.connected else None
+        if ws_client is None or not (added or removed):
+            return # _connect() subscribes to the current set
+        try:
+            if removed:
+                ws_client.unsubscribe(self._stream_names(removed))
+            if added:
+                ws_client.subscribe(self._stream_names(added))
+            logger.debug("Kline stream: subscribed %d, unsubscribed %d symbol(s).", len(added), len(removed))
+        except Exception as e:
+            logger.warning(f"Kline stream subscription update failed, reconnecting: {e}")
+            self._reconnect_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._reconnect_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._connect()
+                self._reconnect_event.wait()
+            except Exception as e:
+                logger.error(f"Kline stream error: {e}", exc_info=True)
+            self._disconnect()
+            if not self._stop_event.is_set():
+                logger.warning(f"Kline stream disconnected. Reconnecting in {self.RECONNECT_DELAY_SECONDS}s...")
+                self._stop_event.wait(self.RECONNECT_DELAY_SECONDS)
+
+    def _connect(self):
+        self._reconnect_event.clear()
+        ws_client = UMFuturesWebsocketClient(
+            stream_url=self.stream_url,
+            on_message=self._on_message,
+            on_close=self._on_close,
+            on_error=self._on_error,
+        )
+        with self._symbols_lock:
+            self._ws_client = ws_client
+            if self._symbols:
+                ws_client.subscribe(self._stream_names(self._symbols))
+            self.connected = True
+        logger.info("Kline stream connected.")
+
+    def _disconnect(self):
+        with self._symbols_lock:
+            self.connected = False
+            ws_client, self._ws_client = self._ws_client, None
+        if ws_client:
+            try:
+                ws_client.stop()
+            except Exception as e:
+                logger.debug(f"Error while stopping the kline WebSocket: {e}")
+
+    def _on_message(self, _, message, _loads=orjson.loads):
+        # Subscription acknowledgements ({"result": null, "id": ...}) carry no kline.
+        if '"kline"' not in message:
+            return
+        try:
+            event = _loads(message)
+            kline = event['k']
+            self.on_kline(event['s'], kline['i'], kline['t'],
+                          float(kline['h']), float(kline['l']), float(kline['c']))
+            # Not the update with k.x set: at that point the closed candle is still the cache's last (forming) row,
+            # so the strategy would skip it. Only the next candle's first update appends a row after it.
+            if kline['t'] > self._newest_open_time:
+                if self._newest_open_time and self.on_candle_close:
+                    timer = threading.Timer(self.CANDLE_CLOSE_SETTLE_SECONDS, self.on_candle_close)
+                    timer.daemon = True
+                    timer.start()
+                self._newest_open_time = kline['t']
+        except (orjson.JSONDecodeError, KeyError, ValueError):
+            logger.warning(f"Unparseable kline stream message: {message}")
+
+    def _on_close(self, _):
+        self.connected = False
+        self._reconnect_event.set()
+
+    def _on_error(self, _, error):
+        logger.error(f"Kline WebSocket error: {error}")
+        self.connected = False
+        self._reconnect_event.set()
+
+
 if __name__ == '__main__':
+    # Run from the project root: python -m trading_bot.exchange.binance_client
     standalone_logger = setup_logger(name="trading_bot") 
     standalone_logger.info("--- Testing BinanceFuturesClient Standalone with Order Placement (SL & TP) ---")
     standalone_logger.info(f"Using settings for: {settings.TRADING_MODE} mode (loaded via settings.py).")
@@ -0,0 +1,221 @@
+# trading_bot/utils/kline_cache.py
+import hashlib
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger("trading_bot")
+
+_INTERVAL_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'M': 2592000}
+_TTL_EPSILON_SECONDS = 1.0
+
+# Shared by every KlineCache in the process: (symbol, interval, limit) -> state dict
+_KLINE_STATE = {}
+_STATE_LOCK = threading.Lock()
+
+
+def _interval_seconds(interval):
+    """Converts a Binance kline interval ("5m", "1h", "1d", ...) to seconds."""
+    return int(interval[:-1]) * _INTERVAL_UNIT_SECONDS[interval[-1]]
+
+
+class KlineCache:
+    """
+    Keeps the most recent 'limit' klines per (symbol, interval) in memory and tops them up
+    incrementally, so each loop only downloads the candles that changed since the last one
+    instead of the full history.
+
+    The state is process-wide: every instance (e.g. one per strategy) reads the same buffers,
+    and a buffer refreshed less than a TTL ago - and not past the close of its last candle - is
+    served without any request at all. With a cache_dir, buffers are also persisted to disk so a
+    restart only has to fetch the candles it missed.
+    """
+
+    # A buffer fed by the kline WebSocket is trusted for this long after its last update
+    STREAM_STALE_SECONDS = 60
+
+    def __init__(self, client, limit, max_age_seconds=None, cache_dir=None):
+        """
+        :param client: Instance of BinanceFuturesClient.
+        :param limit: Number of klines to keep (and to fetch on a cold start) per key.
+        :param max_age_seconds: Upper bound for the TTL. The TTL is otherwise one kline interval; keep it
+                                below the engine loop interval so the forming candle's price stays current.
+        :param cache_dir: Directory for the on-disk copies (one .npy file per key), or None for memory only.
+        """
+        self.client = client
+        self.limit = limit
+        self.max_age_seconds = max_age_seconds
+        self.cache_dir = cache_dir
+
+    def _ttl(self, interval):
+        ttl = _interval_seconds(interval)
+        if self.max_age_seconds is not None:
+            ttl = min(ttl, self.max_age_seconds)
+        return max(0.0, ttl - _TTL_EPSILON_SECONDS)
+
+    def _get_state(self, key):
+        with _STATE_LOCK:
+            state = _KLINE_STATE.get(key)
+            if state is None:
+                state = {
+                    # Preallocated ring of (open_time, high, low, close) rows; 'head' is the next slot to write.
+                    'buffer': np.empty((key[2], 4), dtype=np.float64),
+                    'head': 0,
+                    'filled': 0,
+                    'lock': threading.Lock(),
+                    'expires_at': 0.0, # Wall-clock time
+                    'arrays': None,
+                    'disk_checked': False,
+                    'persisted_open_time': None, # Open time of the last candle written to disk
+                    'streamed_until': 0.0, # Wall-clock time until which the stream keeps the buffer current
+                }
+                _KLINE_STATE[key] = state
+            return state
+
+    def _cache_path(self, symbol, interval):
+        key_hash = hashlib.md5(f"{symbol}:{interval}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key_hash}.npy")
+
+    def _load_from_disk(self, state, symbol, interval):
+        """Fills an empty ring from the on-disk copy, if there is one."""
+        state['disk_checked'] = True
+        path = self._cache_path(symbol, interval)
+        if not os.path.exists(path):
+            return
+        try:
+            table = np.load(path)[-self.limit:]
+        except Exception as e:
+            logger.warning(f"KlineCache: could not read {path}: {e}")
+            return
+        count = table.shape[0]
+        state['buffer'][:count] = table
+        state['head'] = count % self.limit
+        state['filled'] = count
+        state['persisted_open_time'] = table[-1, 0] if count else None
+
+    def _save_to_disk(self, state, symbol, interval, table):
+        """Writes the unrolled ring to disk (temp file + os.replace) when it gained a candle."""
+        if table[-1, 0] == state['persisted_open_time']:
+            return
+        path = self._cache_path(symbol, interval)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, table)
+            os.replace(tmp_path, path)
+            state['persisted_open_time'] = table[-1, 0]
+        except Exception as e:
+            logger.warning(f"KlineCache: could not write {path}: {e}")
+
+    def apply_stream_kline(self, symbol, interval, open_time, high, low, close):
+        """
+        Applies one kline update from the WebSocket stream (see KlineStreamListener) to the ring:
+        the forming candle is overwritten in place and a new candle is appended. While updates keep
+        arriving, get_arrays() serves the buffer without any REST request.
+        """
+        state = self._get_state((symbol, interval, self.limit))
+        with state['lock']:
+            if not state['filled']:
+                return # The history is fetched over REST first
+            buffer = state['buffer']
+            last = (state['head'] - 1) % self.limit
+            last_open_time = buffer[last, 0]
+            if open_time == last_open_time:
+                buffer[last, 1:] = (high, low, close)
+            elif open_time == last_open_time + _interval_seconds(interval) * 1000:
+                buffer[state['head']] = (open_time, high, low, close)
+                state['head'] = (state['head'] + 1) % self.limit
+                state['filled'] = min(state['filled'] + 1, self.limit)
+            elif open_time > last_open_time:
+                # Candles were missed (e.g. during a reconnect); the next get_arrays() bridges the gap over REST.
+                state['streamed_until'] = 0.0
+                return
+            else:
+                return
+            state['arrays'] = None
+            state['streamed_until'] = time.time() + self.STREAM_STALE_SECONDS
+
+    def _build_arrays(self, state, symbol, interval):
+        """Unrolls the ring, oldest first, into the (read-only, contiguous) arrays handed to callers."""
+        start = state['head'] - state['filled']
+        # One gather from the transposed ring (mode='wrap' does the modulo) yields each column as a contiguous row.
+        columns = np.take(state['buffer'].T, start + np.arange(state['filled']), axis=1, mode='wrap')
+        columns.flags.writeable = False
+        state['arrays'] = {
+            'open_time': columns[0].astype(np.int64),
+            'high': columns[1],
+            'low': columns[2],
+            'close': columns[3],
+        }
+        if self.cache_dir:
+            self._save_to_disk(state, symbol, interval, columns.T)
+
+    @classmethod
+    def invalidate(cls, symbol=None, interval=None):
+        """Drops cached klines for (symbol, interval), or everything when called without arguments."""
+        with _STATE_LOCK:
+            for key in list(_KLINE_STATE):
+                if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                    del _KLINE_STATE[key]
+
+    def get_arrays(self, symbol, interval):
+        """
+        Returns the cached klines for (symbol, interval) in the format of
+        BinanceFuturesClient.get_historical_kline_arrays(), refreshing them first if the TTL has expired.
+        The arrays are shared between callers and read-only.
+
+        :return: Dict of 'open_time', 'high', 'low', 'close' arrays, or None if nothing could be fetched.
+        """
+        state = self._get_state((symbol, interval, self.limit))
+        with state['lock']:
+            now = time.time()
+            if state['filled'] and now < state['streamed_until']:
+                if state['arrays'] is None:
+                    self._build_arrays(state, symbol, interval)
+                return state['arrays']
+            if state['arrays'] is not None and now < state['expires_at']:
+                return state['arrays']
+
+            if not state['filled'] and not state['disk_checked'] and self.cache_dir:
+                self._load_from_disk(state, symbol, interval)
+
+            buffer = state['buffer']
+            if state['filled']:
+                # Re-fetch from the last cached candle: it was still forming when we stored it.
+                last_open_time = int(buffer[(state['head'] - 1) % self.limit, 0])
+                fresh = self.client.get_historical_kline_arrays(symbol, interval, limit=self.limit, start_time=last_open_time)
+                if fresh is None:
+                    return None
+                if fresh['open_time'].shape[0] >= self.limit:
+                    # Too many candles passed since the last update to bridge incrementally.
+                    state['head'] = state['filled'] = 0
+                else:
+                    # Step the head back over the candles the fetch returns again.
+                    first_new_open_time = fresh['open_time'][0]
+                    while state['filled'] and buffer[(state['head'] - 1) % self.limit, 0] >= first_new_open_time:
+                        state['head'] = (state['head'] - 1) % self.limit
+                        state['filled'] -= 1
+
+            if not state['filled']:
+                fresh = self.client.get_historical_kline_arrays(symbol, interval, limit=self.limit)
+                if fresh is None:
+                    return None
+
+            # Each column is copied straight into its slots of the preallocated ring.
+            count = min(fresh['open_time'].shape[0], self.limit)
+            slots = (state['head'] + np.arange(count)) % self.limit
+            for column, key in enumerate(('open_time', 'high', 'low', 'close')):
+                buffer[slots, column] = fresh[key][-count:]
+            state['head'] = (state['head'] + count) % self.limit
+            state['filled'] = min(state['filled'] + count, self.limit)
+            logger.debug("KlineCache: %d kline(s) updated for %s %s.", count, symbol, interval)
+
+            self._build_arrays(state, symbol, interval)
+
+            # Expire after the TTL, or as soon as the last (forming) candle closes, whichever comes first.
+            last_candle_close = state['arrays']['open_time'][-1] / 1000.0 + _interval_seconds(interval)
+            state['expires_at'] = min(now + self._ttl(interval), last_candle_close)
+            return state['arrays']
@@ -1,22 +1,50 @@
 # trading_bot/utils/logger_config.py
 import logging
-import sys
 import os
+import time
+import threading
 import colorlog
 from logging.handlers import RotatingFileHandler 
 from colorlog import ColoredFormatter # Import ColoredFormatter
 
-try:
-    from trading_bot.config import settings
-except ImportError:
-    # Fallback logic as before... (omitted for brevity in this example, but keep it in your actual file)
-    print("DEBUG: Could not import 'from trading_bot.config import settings'. Attempting relative path adjustment for settings.")
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    trading_bot_dir = os.path.dirname(current_dir)
-    project_root_dir = os.path.dirname(trading_bot_dir)
-    if project_root_dir not in sys.path:
-        sys.path.insert(0, project_root_dir)
-    from trading_bot.config import settings
+from trading_bot.config import settings
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops repeats of opted-in records (logged with extra={'rate_limited': True}) that have the
+    same message and arguments as one emitted less than 'window_seconds' ago.
+    Records without the flag are never dropped. One instance can be shared by several handlers:
+    the decision is stored on the record, so every handler lets the same records through.
+    """
+    MAX_KEYS = 1024 # Expired keys are pruned once this many are tracked
+
+    def __init__(self, window_seconds=60.0):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self._last_emitted = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'rate_limited', False):
+            return True
+        decision = getattr(record, '_rate_limit_passed', None)
+        if decision is not None:
+            return decision # Already decided by another handler
+        try:
+            key = (record.name, record.msg, repr(record.args))
+        except Exception:
+            return True # A filter must never break logging
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_emitted.get(key)
+            decision = last is None or now - last >= self.window_seconds
+            if decision:
+                self._last_emitted[key] = now
+                if len(self._last_emitted) > self.MAX_KEYS:
+                    self._last_emitted = {k: t for k, t in self._last_emitted.items() if now - t < self.window_seconds}
+        record._rate_limit_passed = decision
+        return decision
 
 
 def setup_logger(name="trading_bot"):
@@ -55,6 +83,8 @@ def setup_logger(name="trading_bot"):
     )
     console_handler.setFormatter(console_formatter)
     console_handler.setLevel(numeric_level)
+    rate_limit_filter = RateLimitFilter(window_seconds=60.0) # Shared by both handlers (see RateLimitFilter)
+    console_handler.addFilter(rate_limit_filter)
     logger.addHandler(console_handler)
 
     # 4. File Handler (with rotation)
@@ -81,6 +111,7 @@ def setup_logger(name="trading_bot"):
         file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)-8s - %(message)s')
         file_handler.setFormatter(file_formatter)
         file_handler.setLevel(numeric_level)
+        file_handler.addFilter(rate_limit_filter)
         logger.addHandler(file_handler)
 
     # Prevent messages from propagating to the root logger's handlers
@@ -1,36 +1,104 @@
 # trading_bot/utils/notifier.py
+import queue
+import threading
+import time
 import requests
 import logging
 from trading_bot.config import settings
 
 logger = logging.getLogger("trading_bot")
 
-def send_telegram_message(message: str):
-    """Sends a message to the configured Telegram chat."""
-    bot_token = settings.TELEGRAM_BOT_TOKEN
-    chat_id = settings.TELEGRAM_CHAT_ID
-
-    if not bot_token or not chat_id:
-        logger.debug("Telegram BOT_TOKEN or CHAT_ID not configured. Skipping notification.")
-        return False
+# Messages are sent by a background thread so the trading loop never waits on api.telegram.org.
+_TG_QUEUE = queue.Queue()
+_TG_SENDER = None
+_TG_SENDER_LOCK = threading.Lock()
+_BATCH_WINDOW_SECONDS = 0.2 # Messages queued within this window are sent as one
+_MAX_MESSAGE_LENGTH = 4096  # Telegram's limit for a single message
+# Used only by the sender thread: keeps the TLS connection to api.telegram.org alive between messages
+_SESSION = requests.Session()
 
+def _post_message(bot_token, chat_id, message):
+    """Performs the actual HTTPS POST to Telegram."""
     # Using MarkdownV2 for better formatting. Note that some characters must be escaped.
     # Characters that must be escaped: _ * [ ] ( ) ~ ` > # + - = | { } . !
     # We will create a helper function for this if complex messages are needed.
     # For now, we will send simple messages.
     # A more robust implementation would use a Telegram library or handle formatting better.
-    
+
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
     payload = {
         'chat_id': chat_id,
         'text': message,
     }
-    
+
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = _SESSION.post(url, json=payload, timeout=10)
         response.raise_for_status() # Raises an exception for bad status codes (4xx or 5xx)
-        logger.debug(f"Successfully sent Telegram message: {message}")
+        logger.debug("Successfully sent Telegram message: %s", message)
         return True
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to send Telegram message: {e}", exc_info=False) # exc_info=False to keep log clean
-        return False
\ No newline at end of file
+        return False
+
+def _sender_loop(bot_token, chat_id):
+    """Consumes _TG_QUEUE, joining messages that arrive close together into a single sendMessage call."""
+    while True:
+        batch = [_TG_QUEUE.get()]
+        batch_length = len(batch[0])
+        deadline = time.monotonic() + _BATCH_WINDOW_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = _TG_QUEUE.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if batch_length + len(message) + 2 > _MAX_MESSAGE_LENGTH:
+                _post_message(bot_token, chat_id, "\n\n".join(batch))
+                for _ in batch:
+                    _TG_QUEUE.task_done()
+                batch, batch_length = [], 0
+            batch.append(message)
+            batch_length += len(message) + 2
+        _post_message(bot_token, chat_id, "\n\n".join(batch))
+        for _ in batch:
+            _TG_QUEUE.task_done()
+
+def send_telegram_message(message: str):
+    """
+    Queues a message for the configured Telegram chat. The message is sent by a background thread.
+
+    :return: True if the message was queued, False if Telegram is not configured.
+    """
+    global _TG_SENDER
+    bot_token = settings.TELEGRAM_BOT_TOKEN
+    chat_id = settings.TELEGRAM_CHAT_ID
+
+    if not bot_token or not chat_id:
+        logger.debug("Telegram BOT_TOKEN or CHAT_ID not configured. Skipping notification.")
+        return False
+
+    if _TG_SENDER is None:
+        with _TG_SENDER_LOCK:
+            if _TG_SENDER is None:
+                _TG_SENDER = threading.Thread(target=_sender_loop, args=(bot_token, chat_id),
+                                              name="TelegramSender", daemon=True)
+                _TG_SENDER.start()
+    _TG_QUEUE.put(message)
+    return True
+
+def flush_telegram_messages(timeout=10.0):
+    """
+    Waits (up to 'timeout' seconds) until all queued messages have been sent. Call before exiting,
+    since the sender is a daemon thread.
+
+    :return: True if the queue was drained in time.
+    """
+    deadline = time.monotonic() + timeout
+    while _TG_QUEUE.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            logger.warning(f"{_TG_QUEUE.unfinished_tasks} Telegram message(s) were not sent before shutdown.")
+            return False
+        time.sleep(0.05)
+    return True
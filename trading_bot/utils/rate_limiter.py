@@ -0,0 +1,44 @@
+# trading_bot/utils/rate_limiter.py
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to 'capacity' tokens, refilled continuously at 'rate'
+    tokens per second. acquire() takes tokens right away while the budget allows and only
+    blocks once it is used up.
+    """
+
+    def __init__(self, capacity, rate):
+        """
+        :param capacity: Maximum number of tokens (the burst size).
+        :param rate: Tokens added per second.
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        """Takes 'cost' tokens (capped at the capacity), waiting for the bucket to refill if needed."""
+        cost = min(cost, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                wait_seconds = (cost - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def sync(self, used):
+        """
+        Aligns the bucket with a server-side count: 'used' of the 'capacity' tokens are already spent in
+        the current window (e.g. by other processes on the same IP). Only ever lowers the available tokens.
+        """
+        with self._lock:
+            self._tokens = min(self._tokens, max(0.0, self.capacity - used))
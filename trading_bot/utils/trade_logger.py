@@ -2,18 +2,13 @@
 import os
 import csv
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
 
 # Import the central settings module to get the configured file path
-try:
-    from trading_bot.config import settings
-except ImportError:
-    # This fallback is mainly for isolated tests or if the script is run in a strange way.
-    # In our main application flow (via main.py), settings will always be available.
-    print("WARNING: Could not import 'settings' in trade_logger.py. Using a default file path 'trade_history.csv'.")
-    class MockSettings:
-        TRADE_HISTORY_CSV_PATH = "trade_history.csv"
-    settings = MockSettings()
+from trading_bot.config import settings
 
 # Get the main logger instance to log potential errors related to this module
 logger = logging.getLogger("trading_bot")
@@ -37,10 +32,15 @@ CSV_HEADERS = [
     'exit_reason'
 ]
 
+# Rows are appended by a background thread so closing a position never waits on disk I/O.
+_TRADE_QUEUE = queue.Queue()
+_TRADE_WRITER = None
+_TRADE_WRITER_LOCK = threading.Lock()
+
 def setup_trade_log_file():
     """
     Ensures the trade log directory and the CSV file with headers exist.
-    This function is called automatically by log_trade before writing.
+    This function is called automatically before each write.
     """
     try:
         # Get the directory part from the full file path (e.g., 'data/')
@@ -70,13 +70,43 @@ def setup_trade_log_file():
         except Exception as e:
             logger.error(f"Failed to create and write headers to trade log file '{TRADE_LOG_FILE_PATH}': {e}", exc_info=True)
 
+def _write_rows(rows):
+    """Appends the given rows to the CSV log file with a single open."""
+    setup_trade_log_file() # Ensure file and headers exist before writing
+    try:
+        # Open the file in append mode ('a') to add the new rows
+        with open(TRADE_LOG_FILE_PATH, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerows(rows)
+        for row in rows:
+            logger.info(f"Successfully logged completed trade for {row[1]} to '{TRADE_LOG_FILE_PATH}'.")
+    except Exception as e:
+        # Fallback to the main logger if file writing fails for any reason
+        logger.error(f"CRITICAL: Failed to write completed trade to log file '{TRADE_LOG_FILE_PATH}': {e}", exc_info=True)
+        for row in rows:
+            logger.info(f"Failed trade log data was: {row}")
+
+def _writer_loop():
+    """Consumes _TRADE_QUEUE; rows queued together are written in one go."""
+    while True:
+        rows = [_TRADE_QUEUE.get()]
+        while True:
+            try:
+                rows.append(_TRADE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        _write_rows(rows)
+        for _ in rows:
+            _TRADE_QUEUE.task_done()
+
 def log_trade(trade_data: dict):
     """
-    Appends a completed trade's details to the CSV log file.
+    Queues a completed trade's details for the CSV log file. The row (and its timestamp) is built
+    here; a background thread appends it to the file.
     
     :param trade_data: A dictionary containing all relevant details of the closed trade.
     """
-    setup_trade_log_file() # Ensure file and headers exist before writing
+    global _TRADE_WRITER
 
     # Prepare the row data in the correct order as defined in CSV_HEADERS
     row_to_write = [
@@ -95,13 +125,24 @@ def log_trade(trade_data: dict):
         trade_data.get('exit_reason', 'N/A')
     ]
 
-    try:
-        # Open the file in append mode ('a') to add a new row
-        with open(TRADE_LOG_FILE_PATH, 'a', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(row_to_write)
-            logger.info(f"Successfully logged completed trade for {trade_data.get('symbol')} to '{TRADE_LOG_FILE_PATH}'.")
-    except Exception as e:
-        # Fallback to the main logger if file writing fails for any reason
-        logger.error(f"CRITICAL: Failed to write completed trade to log file '{TRADE_LOG_FILE_PATH}': {e}", exc_info=True)
-        logger.info(f"Failed trade log data was: {row_to_write}")
\ No newline at end of file
+    if _TRADE_WRITER is None:
+        with _TRADE_WRITER_LOCK:
+            if _TRADE_WRITER is None:
+                _TRADE_WRITER = threading.Thread(target=_writer_loop, name="TradeLogWriter", daemon=True)
+                _TRADE_WRITER.start()
+    _TRADE_QUEUE.put(row_to_write)
+
+def flush_trade_log(timeout=5.0):
+    """
+    Waits (up to 'timeout' seconds) until all queued trades have been written. Call before exiting,
+    since the writer is a daemon thread.
+
+    :return: True if the queue was drained in time.
+    """
+    deadline = time.monotonic() + timeout
+    while _TRADE_QUEUE.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            logger.warning(f"{_TRADE_QUEUE.unfinished_tasks} trade(s) were not written to '{TRADE_LOG_FILE_PATH}' before shutdown.")
+            return False
+        time.sleep(0.05)
+    return True